@@ -3,7 +3,6 @@ Add sample quiz data to test the database
 """
 
 from database import SessionLocal, Quiz
-import json
 
 def add_sample_quizzes():
     """Add sample quiz records"""
@@ -15,7 +14,7 @@ def add_sample_quizzes():
             url="https://en.wikipedia.org/wiki/Python_(programming_language)",
             title="Python Programming Quiz",
             scraped_content="Python is a high-level, interpreted programming language...",
-            full_quiz_data=json.dumps({
+            full_quiz_data={
                 "questions": [
                     {
                         "question": "What is Python?",
@@ -28,7 +27,7 @@ def add_sample_quizzes():
                         "correct_answer": "Guido van Rossum"
                     }
                 ]
-            })
+            }
         )
         
         # Sample Quiz 2
@@ -36,7 +35,7 @@ def add_sample_quizzes():
             url="https://en.wikipedia.org/wiki/Artificial_intelligence",
             title="Artificial Intelligence Quiz",
             scraped_content="Artificial intelligence (AI) is intelligence demonstrated by machines...",
-            full_quiz_data=json.dumps({
+            full_quiz_data={
                 "questions": [
                     {
                         "question": "What does AI stand for?",
@@ -44,7 +43,7 @@ def add_sample_quizzes():
                         "correct_answer": "Artificial Intelligence"
                     }
                 ]
-            })
+            }
         )
         
         db.add(quiz1)
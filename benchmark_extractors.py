@@ -0,0 +1,87 @@
+"""
+Benchmark the HTML extraction backends against saved Wikipedia pages
+
+Checks that every backend produces the same title/content as html.parser,
+then times each one. Add more pages with e.g.:
+    curl -o fixtures/wikipedia/World_War_II.html https://en.wikipedia.org/wiki/World_War_II
+
+Usage: python benchmark_extractors.py [rounds]
+"""
+
+import glob
+import os
+import sys
+import time
+
+from html_extractors import EXTRACTORS
+from scraper import parse_wikipedia_html
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "wikipedia")
+REFERENCE = "html.parser"
+
+
+def load_fixtures():
+    """Load every saved page as raw bytes, keyed by file name."""
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, "rb") as f:
+            fixtures[os.path.basename(path)] = f.read()
+    return fixtures
+
+
+def normalized_extraction(backend, html):
+    """Full (untruncated) title and paragraph texts as the scraper sees them."""
+    title, paragraphs = EXTRACTORS[backend](html)
+    return (title or "").strip(), [p.strip() for p in paragraphs or []]
+
+
+def check_identical(fixtures):
+    """Compare each backend's output with the html.parser reference."""
+    all_match = True
+    for name, html in fixtures.items():
+        expected = normalized_extraction(REFERENCE, html)
+        for backend in EXTRACTORS:
+            if normalized_extraction(backend, html) != expected:
+                print(f"❌ {backend} output differs from {REFERENCE} on {name}")
+                all_match = False
+    return all_match
+
+
+def time_backend(backend, html, rounds):
+    """Best-of-rounds wall time in milliseconds for one page."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        parse_wikipedia_html(html, extractor=backend)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    fixtures = load_fixtures()
+    if not fixtures:
+        print(f"❌ No fixtures found in {FIXTURES_DIR}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("⏱️  HTML Extraction Benchmark")
+    print("=" * 60)
+    print(f"Backends: {', '.join(EXTRACTORS)}")
+    print(f"Rounds:   {rounds} (best time reported)\n")
+
+    if check_identical(fixtures):
+        print("✅ All backends produce identical title/content\n")
+
+    header = f"{'fixture':32} {'KB':>7}" + "".join(f" {b:>12}" for b in EXTRACTORS)
+    print(header)
+    print("-" * len(header))
+    for name, html in fixtures.items():
+        timings = [time_backend(backend, html, rounds) for backend in EXTRACTORS]
+        row = f"{name[:32]:32} {len(html) / 1024:7.0f}"
+        row += "".join(f" {ms:10.1f}ms" for ms in timings)
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
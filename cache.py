@@ -0,0 +1,92 @@
+"""
+In-process LRU cache bounded by the total size of its values in bytes
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+
+class ByteLRUCache:
+    """
+    Thread-safe LRU cache of bytes values.
+
+    Entries are evicted least-recently-used first once the summed length of
+    all values would exceed `max_bytes`. Values larger than the whole budget
+    are not stored. With `ttl_seconds`, entries also expire that long after
+    they were stored. Hit/miss/eviction counters are kept for monitoring.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._expires_at: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Return the cached value and mark it recently used, or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None and self.ttl_seconds is not None and self._expires_at[key] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                value = None
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: bytes):
+        """Store a value, evicting least recently used entries to make room."""
+        size = len(value)
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+            while self._entries and self.current_bytes + size > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+            self._entries[key] = value
+            self.current_bytes += size
+            if self.ttl_seconds is not None:
+                self._expires_at[key] = time.monotonic() + self.ttl_seconds
+
+    def delete(self, key: Hashable):
+        """Drop an entry if present."""
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._expires_at.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Counters and current usage, for monitoring."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+    def _remove(self, key: Hashable):
+        self._expires_at.pop(key, None)
+        value = self._entries.pop(key, None)
+        if value is not None:
+            self.current_bytes -= len(value)
@@ -0,0 +1,90 @@
+"""
+Circuit breaker for calls to an unreliable remote service
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Thread-safe consecutive-failure circuit breaker.
+
+    While closed, calls go through. After `failure_threshold` consecutive
+    failures the breaker opens and allow_request() refuses calls, so callers
+    can short-circuit to a fallback instead of waiting on a failing service.
+    `reset_timeout` seconds later it lets a single probe call through
+    (half-open): a success closes it again, a failure re-opens it. A probe
+    that never reports back is replaced by a new one after another
+    `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_count = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probe_started_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Whether a call may be made now; refusals are counted."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probe_started_at = now
+                return True
+            if self.state == HALF_OPEN and now - self._probe_started_at >= self.reset_timeout:
+                self._probe_started_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def is_open(self) -> bool:
+        """
+        Whether calls are currently being refused (without taking the probe
+        slot). False once `reset_timeout` has passed, when the next
+        allow_request() would let a probe through.
+        """
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._probe_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opened_count += 1
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_started_at = None
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            retry_in = 0.0
+            if self.state == OPEN:
+                retry_in = max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "opened": self.opened_count,
+                "rejected": self.rejected,
+                "retry_in_seconds": round(retry_in, 1)
+            }
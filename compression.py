@@ -0,0 +1,55 @@
+"""
+Text compression for large stored values (full article text)
+
+zstd is used when the zstandard package is installed (pip install zstandard),
+zlib otherwise. The codec name is stored next to the data, so values written
+with either codec can always be read back.
+"""
+
+import os
+import zlib
+from typing import Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# zstandard is optional: pip install zstandard
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Preferred codec for new values: zstd or zlib
+ARTICLE_COMPRESSION = os.getenv("ARTICLE_COMPRESSION", "zstd" if ZSTD_AVAILABLE else "zlib").lower()
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 6
+
+
+def compress_text(text: str) -> Tuple[bytes, str]:
+    """
+    Compress UTF-8 text with the configured codec.
+    
+    Returns:
+        (compressed bytes, codec name)
+    """
+    data = text.encode("utf-8")
+    if ARTICLE_COMPRESSION == "zstd" and ZSTD_AVAILABLE:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data), "zstd"
+    return zlib.compress(data, ZLIB_LEVEL), "zlib"
+
+
+def decompress_text(data: bytes, codec: str) -> str:
+    """
+    Inverse of compress_text.
+    
+    Raises:
+        ValueError: If the codec is unknown or zstandard is needed but not installed
+    """
+    if codec == "zlib":
+        return zlib.decompress(data).decode("utf-8")
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ValueError("Article is zstd-compressed; install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(bytes(data)).decode("utf-8")
+    raise ValueError(f"Unknown compression codec '{codec}'")
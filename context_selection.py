@@ -0,0 +1,145 @@
+"""
+Relevance-ranked context selection for the quiz prompt
+
+Instead of sending the first few thousand characters of an article, the
+article is split into paragraphs, each paragraph is scored by TF-IDF
+similarity to the article's salient terms (with the title's terms boosted),
+and the best paragraphs that fit a token budget, skipping near-duplicates,
+are sent in document order. The lead paragraph is always kept. Requires
+NumPy; without it the leading text is used as before.
+"""
+
+import os
+import re
+from typing import List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# NumPy is optional: pip install numpy
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+QUIZ_CONTEXT_SELECTION = os.getenv("QUIZ_CONTEXT_SELECTION", "true").lower() == "true"
+QUIZ_CONTEXT_TOKEN_BUDGET = int(os.getenv("QUIZ_CONTEXT_TOKEN_BUDGET", "1000"))
+
+# Characters sent when context selection is off (the original prompt cut)
+LEGACY_CONTEXT_CHARS = 4000
+
+# Paragraphs this similar (cosine of TF-IDF vectors) to a chosen one are skipped
+REDUNDANCY_THRESHOLD = 0.8
+
+# Used when the model's token counter is not available
+DEFAULT_TOKENS_PER_CHAR = 0.25
+
+WORD_PATTERN = re.compile(r"[^\W\d_]{3,}")
+STOPWORDS = frozenset("""
+about after also although among and are because been before being between both but can could did does during each
+either for from had has have her hers him his how however into its itself many more most much not now only other our
+over said same she should since some such than that the their them then there these they this those through thus too
+under until upon very was were what when where whether which while who whom whose why will with within without would
+yet you your
+""".split())
+
+
+def split_passages(content: str) -> List[str]:
+    """Paragraphs of article text as joined by scraper.build_article."""
+    return [passage.strip() for passage in content.split("\n\n") if passage.strip()]
+
+
+def _terms(text: str) -> List[str]:
+    return [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+
+def _tfidf(passages: List[str]):
+    """TF-IDF matrix (passages x terms) and the term -> column mapping."""
+    vocabulary = {}
+    rows, columns = [], []
+    for row, passage in enumerate(passages):
+        for term in _terms(passage):
+            rows.append(row)
+            columns.append(vocabulary.setdefault(term, len(vocabulary)))
+
+    counts = np.zeros((len(passages), max(len(vocabulary), 1)), dtype=np.float32)
+    np.add.at(counts, (rows, columns), 1)
+
+    # Term frequency per passage, inverse document frequency across passages
+    term_frequency = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+    document_frequency = (counts > 0).sum(axis=0)
+    inverse_document_frequency = np.log((1 + len(passages)) / (1 + document_frequency)) + 1
+    return term_frequency * inverse_document_frequency, vocabulary
+
+
+def _normalize_rows(matrix: "np.ndarray") -> "np.ndarray":
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def rank_passages(passages: List[str], title: str = "", tfidf=None) -> "np.ndarray":
+    """
+    Score passages by how much of the article's salient vocabulary they cover.
+
+    Args:
+        passages: Paragraph texts
+        title: Article title; its terms count as salient
+        tfidf: Precomputed (matrix, vocabulary) from _tfidf, optional
+
+    Returns:
+        Array of scores in [0, 1], one per passage
+    """
+    matrix, vocabulary = tfidf or _tfidf(passages)
+    salience = matrix.sum(axis=0)
+    title_columns = [vocabulary[term] for term in _terms(title) if term in vocabulary]
+    if title_columns:
+        salience[title_columns] += salience.max()
+
+    return _normalize_rows(matrix) @ (salience / max(np.linalg.norm(salience), 1e-12))
+
+
+def select_context(content: str, title: str = "", token_budget: Optional[int] = None,
+                   tokens_per_char: float = DEFAULT_TOKENS_PER_CHAR) -> str:
+    """
+    Pick the article text to put in the prompt.
+
+    Args:
+        content: Article text, paragraphs separated by blank lines
+        title: Article title
+        token_budget: Maximum prompt tokens for the article (default QUIZ_CONTEXT_TOKEN_BUDGET)
+        tokens_per_char: Token/character ratio of this text, ideally measured
+            with the model's token counter
+
+    Returns:
+        Selected paragraphs in document order, or the leading text when
+        selection is disabled or NumPy is missing
+    """
+    if not QUIZ_CONTEXT_SELECTION:
+        return content[:LEGACY_CONTEXT_CHARS]
+
+    budget_chars = int((token_budget or QUIZ_CONTEXT_TOKEN_BUDGET) / tokens_per_char)
+    if len(content) <= budget_chars:
+        return content
+    if not NUMPY_AVAILABLE:
+        return content[:budget_chars]
+
+    passages = split_passages(content)
+    tfidf = _tfidf(passages)
+    scores = rank_passages(passages, title, tfidf)
+    scores[0] = np.inf  # The lead paragraph introduces the topic
+    unit_rows = _normalize_rows(tfidf[0])
+
+    chosen, used_chars = [], 0
+    for index in np.argsort(-scores, kind="stable"):
+        cost = len(passages[index]) + (2 if chosen else 0)
+        if used_chars + cost > budget_chars:
+            continue
+        # Skip near-duplicates of paragraphs already chosen
+        if chosen and (unit_rows[chosen] @ unit_rows[index]).max() > REDUNDANCY_THRESHOLD:
+            continue
+        chosen.append(index)
+        used_chars += cost
+
+    if not chosen:
+        return passages[0][:budget_chars]
+    return "\n\n".join(passages[index] for index in sorted(chosen))
@@ -3,13 +3,20 @@ Database configuration and models for AI Wiki Quiz Generator
 Uses SQLAlchemy ORM with PostgreSQL
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
+from sqlalchemy import create_engine, Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Index, JSON, LargeBinary, inspect, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, relationship, deferred
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from dotenv import load_dotenv
 from datetime import datetime
+from typing import Optional
+import json
 import os
 
+from scraper import canonicalize_wikipedia_url
+from compression import compress_text, decompress_text
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -22,6 +29,7 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 
 # Construct PostgreSQL database URL
 DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
 # Create SQLAlchemy engine
 engine = create_engine(
@@ -33,9 +41,20 @@ engine = create_engine(
 # Create SessionLocal class for database sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine and sessions for request handlers that must not block the event loop
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    echo=False
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Create Base class for declarative models
 Base = declarative_base()
 
+# JSONB on PostgreSQL (queryable and indexable server-side), plain JSON elsewhere
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 
 # Quiz Model
 class Quiz(Base):
@@ -43,18 +62,115 @@ class Quiz(Base):
     Quiz model to store quiz generation history
     """
     __tablename__ = "quizzes"
+    __table_args__ = (
+        # One reusable quiz per article and question count; NULL keys are never reused
+        Index("ix_quizzes_canonical_url_num_questions", "canonical_url", "num_questions", unique=True),
+        # Keyset pagination of /history (newest first, id breaks ties)
+        Index("ix_quizzes_date_generated_id", "date_generated", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     url = Column(String(500), nullable=False)
+    canonical_url = Column(String(500), nullable=True)  # See scraper.canonicalize_wikipedia_url
+    num_questions = Column(Integer, nullable=True)
     title = Column(String(255), nullable=False)
     date_generated = Column(DateTime, default=datetime.now, nullable=False)
     scraped_content = Column(Text, nullable=True)
-    full_quiz_data = Column(Text, nullable=False)  # Stores serialized JSON string
+    full_quiz_data = Column(JSONType, nullable=False)  # {"summary", "questions", "related_topics"}
+    # Model that wrote the questions, or "local" (local_quiz_generator); NULL for older quizzes
+    generated_by = Column(String(64), nullable=True)
+    # Set while Gemini's questions for a local quiz are still awaited (see quiz_service)
+    upgrade_started_at = Column(DateTime, nullable=True)
+    # Ready-to-send GET /quiz/{id} body (quiz_json.build_quiz_json), only loaded when asked for
+    response_json = deferred(Column(LargeBinary, nullable=True))
+    # Complete extracted article, compressed (see article_text); only loaded when asked for
+    article_compressed = deferred(Column(LargeBinary, nullable=True), group="article")
+    article_codec = deferred(Column(String(8), nullable=True), group="article")
+    
+    # Article version the quiz was generated from, used for conditional re-fetches
+    revision_id = Column(BigInteger, nullable=True)
+    etag = Column(String(255), nullable=True)
+    last_modified = Column(String(64), nullable=True)
+    validated_at = Column(DateTime, nullable=True)  # Last time the article was confirmed unchanged
+    
+    # Normalized copy of full_quiz_data["questions"] for question-level queries
+    questions = relationship(
+        "Question", back_populates="quiz", cascade="all, delete-orphan",
+        passive_deletes=True, order_by="Question.position"
+    )
+    
+    @property
+    def article_text(self) -> Optional[str]:
+        """Full article text the quiz was generated from, None for older quizzes."""
+        if self.article_compressed is None:
+            return None
+        return decompress_text(self.article_compressed, self.article_codec)
+    
+    @article_text.setter
+    def article_text(self, text: str):
+        self.article_compressed, self.article_codec = compress_text(text)
     
     def __repr__(self):
         return f"<Quiz(id={self.id}, title='{self.title}', date={self.date_generated})>"
 
 
+# Question Model
+class Question(Base):
+    """
+    One question of a quiz, mirrored from Quiz.full_quiz_data["questions"]
+    so questions can be filtered and sampled in the database
+    """
+    __tablename__ = "questions"
+    __table_args__ = (
+        Index("ix_questions_quiz_id_position", "quiz_id", "position"),
+        # Filtering by difficulty, paginated/sampled by id
+        Index("ix_questions_difficulty_id", "difficulty", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)  # 0-based order within the quiz
+    text = Column(Text, nullable=False)
+    options = Column(JSONType, nullable=False)
+    correct_answer = Column(Text, nullable=False)
+    difficulty = Column(String(16), nullable=True)
+    explanation = Column(Text, nullable=True)
+    
+    quiz = relationship("Quiz", back_populates="questions")
+    
+    @classmethod
+    def from_quiz_data(cls, position: int, data: dict) -> "Question":
+        """Build a row from one entry of a quiz's "questions" list."""
+        return cls(
+            position=position,
+            text=data.get("question", ""),
+            options=data.get("options", []),
+            correct_answer=data.get("correct_answer", data.get("answer", "")),
+            difficulty=data.get("difficulty"),
+            explanation=data.get("explanation")
+        )
+    
+    def __repr__(self):
+        return f"<Question(id={self.id}, quiz_id={self.quiz_id}, position={self.position})>"
+
+
+# LLM result cache model
+class LLMCacheEntry(Base):
+    """
+    Persistent tier of the Gemini result cache (see llm_cache.py)
+    Survives restarts and is shared by all workers
+    """
+    __tablename__ = "llm_cache"
+    
+    key = Column(String(64), primary_key=True)  # sha256 hex of the generation inputs
+    model = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False)  # Serialized quiz JSON
+    created_at = Column(DateTime, default=datetime.now, nullable=False, index=True)  # For pruning
+    
+    def __repr__(self):
+        return f"<LLMCacheEntry(key='{self.key[:12]}', model='{self.model}')>"
+
+
 # Dependency injection function for FastAPI routes
 def get_db():
     """
@@ -74,5 +190,113 @@ def init_db():
     Create all tables in the database
     Call this function to initialize the database schema
     """
+    existing_tables = set(inspect(engine).get_table_names())
     Base.metadata.create_all(bind=engine)
+    migrate_schema()
+    if "questions" not in existing_tables:
+        _backfill_questions()
     print("Database tables created successfully!")
+
+
+def migrate_schema():
+    """
+    Bring tables created by an older version of the app up to date.
+    create_all() only creates missing tables, so columns and indexes added
+    to existing models are created here. Safe to run on every startup.
+    """
+    inspector = inspect(engine)
+    table = Quiz.__table__
+    column_types = {col["name"]: col["type"] for col in inspector.get_columns(table.name)}
+    existing_columns = set(column_types)
+    existing_indexes = {idx["name"] for idx in inspector.get_indexes(table.name)}
+    added_columns = set()
+
+    with engine.begin() as connection:
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            added_columns.add(column.name)
+
+        if engine.dialect.name == "postgresql" and not isinstance(column_types["full_quiz_data"], JSONB):
+            # Quizzes used to be stored as json.dumps() text
+            connection.execute(text(
+                "ALTER TABLE quizzes ALTER COLUMN full_quiz_data TYPE JSONB USING full_quiz_data::jsonb"
+            ))
+
+        if {"canonical_url", "num_questions"} & added_columns:
+            _backfill_canonical_urls(connection)
+
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(connection)
+
+        cache_table = LLMCacheEntry.__table__
+        existing_cache_indexes = {idx["name"] for idx in inspector.get_indexes(cache_table.name)}
+        for index in cache_table.indexes:
+            if index.name not in existing_cache_indexes:
+                index.create(connection)
+
+
+def _backfill_canonical_urls(connection):
+    """
+    Fill canonical_url/num_questions for quizzes stored before URL reuse existed.
+    Only the newest quiz per (canonical_url, num_questions) gets the key so the
+    unique index can be built; older duplicates stay in history unkeyed.
+    """
+    rows = connection.execute(text(
+        "SELECT id, url, full_quiz_data FROM quizzes ORDER BY date_generated DESC, id DESC"
+    ))
+    seen = set()
+    for quiz_id, url, full_quiz_data in rows.fetchall():
+        try:
+            if isinstance(full_quiz_data, str):
+                full_quiz_data = json.loads(full_quiz_data)
+            num_questions = len(full_quiz_data.get("questions", []))
+        except (TypeError, ValueError, AttributeError):
+            continue
+        key = (canonicalize_wikipedia_url(url), num_questions)
+        if key in seen:
+            continue
+        seen.add(key)
+        connection.execute(
+            text("UPDATE quizzes SET canonical_url = :canonical_url, num_questions = :num_questions WHERE id = :id"),
+            {"canonical_url": key[0], "num_questions": key[1], "id": quiz_id}
+        )
+
+
+def _backfill_questions(batch_size: int = 1000):
+    """
+    Fill the questions table from the quizzes stored before it existed.
+    Quizzes are read in id order, batch_size at a time.
+    """
+    insert_question = Question.__table__.insert()
+    last_id = 0
+    with engine.begin() as connection:
+        while True:
+            rows = connection.execute(
+                text("SELECT id, full_quiz_data FROM quizzes WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                {"last_id": last_id, "limit": batch_size}
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            batch = []
+            for quiz_id, full_quiz_data in rows:
+                if isinstance(full_quiz_data, str):
+                    full_quiz_data = json.loads(full_quiz_data)
+                for position, data in enumerate((full_quiz_data or {}).get("questions", [])):
+                    question = Question.from_quiz_data(position, data)
+                    batch.append({
+                        "quiz_id": quiz_id,
+                        "position": position,
+                        "text": question.text,
+                        "options": question.options,
+                        "correct_answer": question.correct_answer,
+                        "difficulty": question.difficulty,
+                        "explanation": question.explanation
+                    })
+            if batch:
+                connection.execute(insert_question, batch)
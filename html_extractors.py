@@ -0,0 +1,214 @@
+"""
+HTML extraction backends for rendered Wikipedia pages
+Every backend returns the same title and paragraph texts as the original
+BeautifulSoup + html.parser implementation; scraper.parse_wikipedia_html
+picks one by name (SCRAPER_EXTRACTOR) and does the filtering and joining.
+"""
+
+import re
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional, Tuple
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml is optional: pip install lxml
+try:
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+TITLE_ID = "firstHeading"
+CONTENT_ID = "mw-content-text"
+
+# Text inside these tags is not part of get_text() output in BeautifulSoup
+NON_TEXT_TAGS = frozenset(["script", "style", "template"])
+
+# wgRevisionId inside the page's RLCONF script block
+REVISION_ID_TEXT_PATTERN = re.compile(r'"wgRevisionId":(\d+)')
+
+# (title or None, paragraph texts or None when the content div is missing)
+Extraction = Tuple[Optional[str], Optional[List[str]]]
+
+
+def _extract_from_soup(soup: BeautifulSoup) -> Extraction:
+    """Shared tree walk for the BeautifulSoup based backends."""
+    title_tag = soup.find('h1', class_=TITLE_ID)
+    if not title_tag:
+        title_tag = soup.find('h1', id=TITLE_ID)
+    title = title_tag.get_text() if title_tag else None
+
+    content_div = soup.find('div', id=CONTENT_ID)
+    if not content_div:
+        return title, None
+
+    return title, [p.get_text() for p in content_div.find_all('p', recursive=True)]
+
+
+def extract_with_html_parser(html: bytes) -> Extraction:
+    """Full BeautifulSoup tree built with the stdlib html.parser (reference backend)."""
+    return _extract_from_soup(BeautifulSoup(html, 'html.parser'))
+
+
+# Only the heading and the article body are turned into bs4 objects
+ARTICLE_STRAINER = SoupStrainer(id=[TITLE_ID, CONTENT_ID])
+
+
+def extract_with_strainer(html: bytes) -> Extraction:
+    """
+    html.parser with a SoupStrainer: the whole page is still tokenized, but
+    navigation, sidebars and footers are never built into the tree.
+    """
+    return _extract_from_soup(BeautifulSoup(html, 'html.parser', parse_only=ARTICLE_STRAINER))
+
+
+def _lxml_text(element) -> str:
+    """Text of an lxml element, skipping comments and script/style/template like bs4."""
+    parts = []
+    if element.text:
+        parts.append(element.text)
+    for child in element:
+        # Comments and processing instructions have a non-string tag
+        if isinstance(child.tag, str) and child.tag not in NON_TEXT_TAGS:
+            parts.append(_lxml_text(child))
+        if child.tail:
+            parts.append(child.tail)
+    return "".join(parts)
+
+
+def extract_with_lxml(html: bytes) -> Extraction:
+    """libxml2 parser via lxml.html; several times faster than html.parser."""
+    tree = lxml.html.document_fromstring(html.decode("utf-8", errors="replace"))
+
+    title_tags = tree.xpath(
+        "//h1[contains(concat(' ', normalize-space(@class), ' '), ' firstHeading ')]"
+    ) or tree.xpath("//h1[@id='firstHeading']")
+    title = _lxml_text(title_tags[0]) if title_tags else None
+
+    content_divs = tree.xpath("//div[@id='mw-content-text']")
+    if not content_divs:
+        return title, None
+
+    return title, [_lxml_text(p) for p in content_divs[0].iter("p")]
+
+
+class StreamingArticleParser(HTMLParser):
+    """
+    Incremental extractor for pages that are downloaded in chunks.
+
+    Feed decoded HTML with feed(); the title and qualifying paragraphs are
+    collected as they complete, and `done` becomes True once the article
+    body has ended or `char_budget` characters of paragraphs (longer than
+    `min_paragraph_chars`, joined with blank lines) have been collected.
+    The collected text is the same as the full-page backends produce.
+    """
+
+    def __init__(self, char_budget: int, min_paragraph_chars: int = 50):
+        super().__init__(convert_charrefs=True)
+        self.char_budget = char_budget
+        self.min_paragraph_chars = min_paragraph_chars
+        self.title: Optional[str] = None
+        self.revision_id: Optional[int] = None
+        self.paragraphs: List[str] = []
+        self.found_content = False
+        self.done = False
+        self._collected_chars = 0
+        self._title_parts: Optional[List[str]] = None
+        self._paragraph_parts: Optional[List[str]] = None
+        self._content_div_depth = 0
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag in NON_TEXT_TAGS:
+            self._skip_depth += 1
+            return
+
+        if tag == "h1" and self.title is None and self._title_parts is None:
+            attributes = dict(attrs)
+            classes = (attributes.get("class") or "").split()
+            if attributes.get("id") == TITLE_ID or TITLE_ID in classes:
+                self._title_parts = []
+        elif tag == "div":
+            if self._content_div_depth:
+                self._content_div_depth += 1
+            elif not self.found_content and dict(attrs).get("id") == CONTENT_ID:
+                self.found_content = True
+                self._content_div_depth = 1
+        elif tag == "p" and self._content_div_depth:
+            self._paragraph_parts = []
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if tag in NON_TEXT_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+            return
+
+        if tag == "h1" and self._title_parts is not None:
+            self.title = "".join(self._title_parts)
+            self._title_parts = None
+            if self._collected_chars > self.char_budget:
+                self.done = True
+        elif tag == "div" and self._content_div_depth:
+            self._content_div_depth -= 1
+            if not self._content_div_depth:
+                self.done = True
+        elif tag == "p" and self._paragraph_parts is not None:
+            self._finish_paragraph()
+
+    def handle_data(self, data):
+        if self.done:
+            return
+        if self._skip_depth:
+            if self.revision_id is None:
+                match = REVISION_ID_TEXT_PATTERN.search(data)
+                if match:
+                    self.revision_id = int(match.group(1))
+            return
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+        if self._paragraph_parts is not None:
+            self._paragraph_parts.append(data)
+
+    def _finish_paragraph(self):
+        text = "".join(self._paragraph_parts).strip()
+        self._paragraph_parts = None
+        if len(text) <= self.min_paragraph_chars:
+            return
+
+        if self.paragraphs:
+            self._collected_chars += 2  # "\n\n" separator
+        self._collected_chars += len(text)
+        self.paragraphs.append(text)
+
+        # Past the budget the content gets truncated anyway
+        if self._collected_chars > self.char_budget and self.title is not None:
+            self.done = True
+
+
+EXTRACTORS: Dict[str, Callable[[bytes], Extraction]] = {
+    "html.parser": extract_with_html_parser,
+    "strainer": extract_with_strainer,
+}
+if LXML_AVAILABLE:
+    EXTRACTORS["lxml"] = extract_with_lxml
+
+
+def get_extractor(name: str) -> Callable[[bytes], Extraction]:
+    """
+    Look up an extraction backend by name.
+
+    Args:
+        name: One of 'html.parser', 'strainer' or 'lxml'
+
+    Returns:
+        Extraction function
+
+    Raises:
+        ValueError: If the backend is unknown or its dependency is not installed
+    """
+    if name not in EXTRACTORS:
+        available = ", ".join(sorted(EXTRACTORS))
+        raise ValueError(f"Unknown or unavailable HTML extractor '{name}' (available: {available})")
+    return EXTRACTORS[name]
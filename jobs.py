@@ -0,0 +1,223 @@
+"""
+Background quiz generation jobs
+POST /jobs/generate_quiz enqueues a job and returns at once; a bounded pool
+of in-process workers takes jobs off the queue and runs the same pipeline as
+POST /generate_quiz. The queue backend holds both the pending jobs and their
+state (in memory for the default backend); finished jobs are pruned after a
+while. The backend is pluggable: register another one with
+register_queue_backend and select it with JOB_QUEUE_BACKEND.
+"""
+
+import asyncio
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Worker pool and queue settings
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "local")
+# Finished jobs stay readable this long, and at most this many are kept
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+JOB_MAX_STORED = int(os.getenv("JOB_MAX_STORED", "10000"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when a job cannot be accepted because the queue is full."""
+
+
+class Job:
+    """A quiz generation request and its outcome."""
+
+    def __init__(self, wikipedia_url: str, num_questions: int):
+        self.id = uuid.uuid4().hex
+        self.wikipedia_url = wikipedia_url
+        self.num_questions = num_questions
+        self.status = QUEUED
+        self.result = None
+        self.error: Optional[str] = None
+        self.status_code: Optional[int] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+
+class LocalJobQueue:
+    """
+    In-process queue backend: jobs in an OrderedDict, ids on an asyncio.Queue.
+
+    A queue backend owns both the pending work and the job state, so workers
+    and API handlers only ever see jobs through it:
+    - put_job(job) stores a new job and enqueues it, raising QueueFullError
+      when it cannot accept more work
+    - async get_job() waits for the next queued job and returns it
+    - load_job(job_id) returns a job by id, or None
+    - update_job(job) saves a job's changed status and outcome
+    - delete_job(job_id), list_jobs() and qsize() support pruning and
+      monitoring
+    """
+
+    def __init__(self, maxsize: int = 0):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def put_job(self, job: Job):
+        try:
+            self._queue.put_nowait(job.id)
+        except asyncio.QueueFull:
+            raise QueueFullError("Job queue is full")
+        self._jobs[job.id] = job
+
+    async def get_job(self) -> Job:
+        while True:
+            job = self._jobs.get(await self._queue.get())
+            # Jobs are only pruned once finished, but skip anything stale
+            if job is not None and job.status == QUEUED:
+                return job
+
+    def load_job(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def update_job(self, job: Job):
+        self._jobs[job.id] = job
+
+    def delete_job(self, job_id: str):
+        self._jobs.pop(job_id, None)
+
+    def list_jobs(self) -> List[Job]:
+        return list(self._jobs.values())
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+
+QUEUE_BACKENDS: Dict[str, Callable[[int], object]] = {
+    "local": LocalJobQueue,
+}
+
+
+def register_queue_backend(name: str, factory: Callable[[int], object]):
+    """
+    Make a queue backend selectable through JOB_QUEUE_BACKEND.
+
+    Args:
+        name: Backend name
+        factory: Callable taking the maximum queue size and returning a queue
+    """
+    QUEUE_BACKENDS[name] = factory
+
+
+class JobManager:
+    """
+    Accepts jobs, keeps their state and runs them on a fixed number of workers.
+    """
+
+    def __init__(self, handler: Callable[[Job], Awaitable[object]], workers: int = JOB_WORKERS,
+                 queue_size: int = JOB_QUEUE_SIZE, backend: str = JOB_QUEUE_BACKEND):
+        if backend not in QUEUE_BACKENDS:
+            available = ", ".join(sorted(QUEUE_BACKENDS))
+            raise ValueError(f"Unknown job queue backend '{backend}' (available: {available})")
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.backend = backend
+        self.queue = QUEUE_BACKENDS[backend](queue_size)
+        self._running = False
+        self._worker_tasks: List[asyncio.Task] = []
+
+    def start(self):
+        """Create the queue and start the workers (needs a running event loop)."""
+        if self._worker_tasks:
+            return
+        self._running = True
+        self._worker_tasks = [
+            asyncio.ensure_future(self._worker()) for _ in range(self.workers)
+        ]
+
+    async def stop(self):
+        """Cancel the workers and fail the jobs that were still queued or running."""
+        self._running = False
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        for job in self.queue.list_jobs():
+            if job.status == QUEUED:
+                self._fail(job, "Server shut down before the job ran", 503)
+
+    def submit(self, wikipedia_url: str, num_questions: int) -> Job:
+        """
+        Enqueue a job.
+
+        Raises:
+            QueueFullError: If the queue cannot take more jobs
+        """
+        if not self._running:
+            raise RuntimeError("Job workers are not running")
+        self._prune()
+        job = Job(wikipedia_url, num_questions)
+        self.queue.put_job(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.queue.load_job(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        for job in self.queue.list_jobs():
+            counts[job.status] += 1
+        counts["workers"] = len(self._worker_tasks)
+        counts["queue_depth"] = self.queue.qsize()
+        return counts
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get_job()
+            job.status = RUNNING
+            job.started_at = datetime.now()
+            self.queue.update_job(job)
+            try:
+                job.result = await self.handler(job)
+            except asyncio.CancelledError:
+                self._fail(job, "Server shut down while the job was running", 503)
+                raise
+            except Exception as e:
+                self._fail(job, str(getattr(e, "detail", e)), getattr(e, "status_code", 500))
+                continue
+            job.status = SUCCEEDED
+            job.finished_at = datetime.now()
+            self.queue.update_job(job)
+
+    def _fail(self, job: Job, error: str, status_code: int):
+        job.status = FAILED
+        job.error = error
+        job.status_code = status_code
+        job.finished_at = datetime.now()
+        self.queue.update_job(job)
+
+    def _prune(self):
+        """Forget finished jobs past their TTL, and the oldest ones over the cap."""
+        now = datetime.now()
+        jobs = self.queue.list_jobs()
+        stored = len(jobs)
+        for job in jobs:
+            if not job.finished:
+                continue
+            expired = (now - job.finished_at).total_seconds() >= JOB_RESULT_TTL_SECONDS
+            if expired or stored >= JOB_MAX_STORED:
+                self.queue.delete_job(job.id)
+                stored -= 1
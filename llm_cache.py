@@ -0,0 +1,160 @@
+"""
+Cache of Gemini quiz results keyed by a hash of the generation inputs
+
+Two tiers: an in-memory LRU bounded by bytes, and an optional database
+table (llm_cache) that survives restarts and is shared between workers.
+Only successful LLM results are cached, never fallback quizzes. Table rows
+older than LLM_CACHE_TTL_DAYS, and the oldest beyond LLM_CACHE_MAX_ROWS, are
+pruned on startup and every LLM_CACHE_PRUNE_EVERY writes.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from cache import ByteLRUCache
+from database import SessionLocal, AsyncSessionLocal, LLMCacheEntry
+
+load_dotenv()
+
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+LLM_CACHE_PERSIST = os.getenv("LLM_CACHE_PERSIST", "true").lower() == "true"
+# Limits of the llm_cache table (0 = no limit)
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+LLM_CACHE_MAX_ROWS = int(os.getenv("LLM_CACHE_MAX_ROWS", "50000"))
+LLM_CACHE_PRUNE_EVERY = 500
+
+_writes_since_prune = 0
+
+memory_cache = ByteLRUCache(LLM_CACHE_MAX_BYTES)
+
+
+def make_cache_key(content: str, title: str, num_questions: int, model: str, prompt_version: str) -> str:
+    """
+    Hash everything that determines the LLM output.
+    Content is whitespace-normalized so trivially different scrapes share a key.
+    
+    Returns:
+        64-character sha256 hex digest
+    """
+    normalized_content = " ".join(content.split())
+    material = json.dumps(
+        [normalized_content, title.strip(), num_questions, model, prompt_version],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _encode(quiz_data: Dict) -> bytes:
+    return json.dumps(quiz_data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _upsert(model: str, key: str, payload: str):
+    """INSERT ... ON CONFLICT DO NOTHING for a cache row."""
+    return pg_insert(LLMCacheEntry).values(
+        key=key, model=model, payload=payload
+    ).on_conflict_do_nothing(index_elements=["key"])
+
+
+def _prune_statements() -> List:
+    """DELETEs for rows past the TTL and the oldest rows beyond the row limit."""
+    statements = []
+    if LLM_CACHE_TTL_DAYS > 0:
+        cutoff = datetime.now() - timedelta(days=LLM_CACHE_TTL_DAYS)
+        statements.append(delete(LLMCacheEntry).where(LLMCacheEntry.created_at < cutoff))
+    if LLM_CACHE_MAX_ROWS > 0:
+        overflow = (
+            select(LLMCacheEntry.key)
+            .order_by(LLMCacheEntry.created_at.desc())
+            .offset(LLM_CACHE_MAX_ROWS)
+        )
+        statements.append(delete(LLMCacheEntry).where(LLMCacheEntry.key.in_(overflow)))
+    return statements
+
+
+def _prune_due() -> bool:
+    """Count a write; True once every LLM_CACHE_PRUNE_EVERY writes."""
+    global _writes_since_prune
+    _writes_since_prune += 1
+    if _writes_since_prune < LLM_CACHE_PRUNE_EVERY:
+        return False
+    _writes_since_prune = 0
+    return True
+
+
+def prune() -> int:
+    """
+    Delete expired and excess rows from the llm_cache table.
+    
+    Returns:
+        Number of rows deleted
+    """
+    if not LLM_CACHE_PERSIST:
+        return 0
+    deleted = 0
+    try:
+        with SessionLocal() as db:
+            for statement in _prune_statements():
+                deleted += db.execute(statement).rowcount
+            db.commit()
+    except Exception as e:
+        print(f"LLM cache prune failed: {str(e)}")
+    return deleted
+
+
+async def prune_async() -> int:
+    """Async version of prune."""
+    if not LLM_CACHE_PERSIST:
+        return 0
+    deleted = 0
+    try:
+        async with AsyncSessionLocal() as db:
+            for statement in _prune_statements():
+                deleted += (await db.execute(statement)).rowcount
+            await db.commit()
+    except Exception as e:
+        print(f"LLM cache prune failed: {str(e)}")
+    return deleted
+
+
+async def get_async(key: str) -> Optional[Dict]:
+    """
+    Look a key up in memory, then in the database tier.
+    
+    Returns:
+        A fresh copy of the cached quiz data, or None on a miss
+    """
+    value = memory_cache.get(key)
+    if value is None and LLM_CACHE_PERSIST:
+        try:
+            async with AsyncSessionLocal() as db:
+                payload = (await db.execute(
+                    select(LLMCacheEntry.payload).where(LLMCacheEntry.key == key)
+                )).scalar()
+        except Exception as e:
+            print(f"LLM cache lookup failed: {str(e)}")
+            payload = None
+        if payload is not None:
+            value = payload.encode("utf-8")
+            memory_cache.put(key, value)
+    return json.loads(value) if value is not None else None
+
+
+async def put_async(key: str, quiz_data: Dict, model: str):
+    """Store a quiz result in both tiers; persistence errors are only logged."""
+    value = _encode(quiz_data)
+    memory_cache.put(key, value)
+    if LLM_CACHE_PERSIST:
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(_upsert(model, key, value.decode("utf-8")))
+                await db.commit()
+        except Exception as e:
+            print(f"LLM cache write failed: {str(e)}")
+        if _prune_due():
+            await prune_async()
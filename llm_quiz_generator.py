@@ -1,8 +1,21 @@
 import os
+import re
 import json
-from typing import List, Dict
+import time
+import random
+import asyncio
+import threading
+from typing import Awaitable, Callable, List, Dict, Optional, TypeVar
 from dotenv import load_dotenv
 
+import llm_cache
+from context_selection import select_context, split_passages, DEFAULT_TOKENS_PER_CHAR
+from context_selection import QUIZ_CONTEXT_SELECTION, QUIZ_CONTEXT_TOKEN_BUDGET
+from local_quiz_generator import generate_local_quiz, LOCAL_GENERATOR
+from circuit_breaker import CircuitBreaker
+from model_router import ModelRouter
+from rate_limiter import gemini_rate_limiter, RateLimitExceeded
+
 load_dotenv()
 
 # Try to import Google GenAI directly
@@ -12,56 +25,194 @@ try:
 except ImportError:
     GENAI_AVAILABLE = False
 
+# Model and generation settings (gemini-2.5-flash - stable and fast)
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+GEMINI_TEMPERATURE = os.getenv("GEMINI_TEMPERATURE")
+GEMINI_TOP_P = os.getenv("GEMINI_TOP_P")
+GEMINI_MAX_OUTPUT_TOKENS = os.getenv("GEMINI_MAX_OUTPUT_TOKENS")
+
+# Map-reduce generation for long articles: "single" (one call), "map_reduce"
+# (always split) or "auto" (split articles of at least QUIZ_MAP_REDUCE_MIN_CHARS)
+QUIZ_GENERATION_MODE = os.getenv("QUIZ_GENERATION_MODE", "single").lower()
+QUIZ_MAP_REDUCE_MIN_CHARS = int(os.getenv("QUIZ_MAP_REDUCE_MIN_CHARS", "12000"))
+QUIZ_MAP_REDUCE_SECTIONS = int(os.getenv("QUIZ_MAP_REDUCE_SECTIONS", "3"))
+# Extra questions asked per section so duplicates can be dropped
+MAP_REDUCE_EXTRA_QUESTIONS = 1
+DIFFICULTIES = ("easy", "medium", "hard")
+
+# Timeout per Gemini request, retries of transient errors (timeouts, rate
+# limiting, server errors) with jittered exponential backoff, and the circuit
+# breaker that sends requests straight to the fallback during outages
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "30"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+GEMINI_RETRY_BASE_DELAY = float(os.getenv("GEMINI_RETRY_BASE_DELAY", "0.5"))
+GEMINI_RETRY_MAX_DELAY = float(os.getenv("GEMINI_RETRY_MAX_DELAY", "8"))
+GEMINI_BREAKER_FAILURES = int(os.getenv("GEMINI_BREAKER_FAILURES", "5"))
+GEMINI_BREAKER_RESET_SECONDS = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30"))
+# Token counting only tunes the prompt size, so it gets less time
+COUNT_TOKENS_TIMEOUT_SECONDS = 5
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Reply size assumed when reserving rate-limit tokens for a request
+OUTPUT_TOKENS_PER_QUESTION = 150
+OUTPUT_TOKENS_BASE = 200
+
+gemini_breaker = CircuitBreaker(GEMINI_BREAKER_FAILURES, GEMINI_BREAKER_RESET_SECONDS)
+
+# Model per request by article length and question count, with per-model
+# latency/cost metrics (format in model_router.py); GEMINI_MODEL by default
+GEMINI_MODEL_ROUTES = os.getenv("GEMINI_MODEL_ROUTES", "")
+GEMINI_MODEL_PRICES = os.getenv("GEMINI_MODEL_PRICES", "")
+
+model_router = ModelRouter(
+    json.loads(GEMINI_MODEL_ROUTES) if GEMINI_MODEL_ROUTES else [],
+    GEMINI_MODEL,
+    json.loads(GEMINI_MODEL_PRICES) if GEMINI_MODEL_PRICES else {}
+)
+
+T = TypeVar("T")
+
+_gemini_model = None
+_routed_models: Dict[str, object] = {}  # Clients of models other than GEMINI_MODEL
+_gemini_model_lock = threading.Lock()
+
+
+def _generation_config() -> Dict:
+    """Generation config from the GEMINI_* environment variables that are set."""
+    config = {}
+    if GEMINI_TEMPERATURE:
+        config["temperature"] = float(GEMINI_TEMPERATURE)
+    if GEMINI_TOP_P:
+        config["top_p"] = float(GEMINI_TOP_P)
+    if GEMINI_MAX_OUTPUT_TOKENS:
+        config["max_output_tokens"] = int(GEMINI_MAX_OUTPUT_TOKENS)
+    return config
+
 
-def generate_quiz_with_gemini(content: str, title: str, num_questions: int = 5) -> Dict:
+def get_gemini_model(model_name: Optional[str] = None):
     """
-    Generate quiz using Google Gemini AI model.
+    Return the process-wide Gemini model client, configuring the SDK on first use.
+    The client is shared by all threads and the event loop.
     
     Args:
-        content: Wikipedia article content
-        title: Article title
-        num_questions: Number of questions to generate (5-10)
-        
+        model_name: Model to use (default GEMINI_MODEL)
+    
     Returns:
-        Dictionary containing 'summary' and 'questions'
+        genai.GenerativeModel, or None if no API key is set or the SDK is missing
     """
-    api_key = os.getenv("GEMINI_API_KEY")
-    
-    if not api_key or not GENAI_AVAILABLE:
-        return generate_fallback_quiz(content, title, num_questions)
+    global _gemini_model
+    model_name = model_name or GEMINI_MODEL
+    client = _gemini_model if model_name == GEMINI_MODEL else _routed_models.get(model_name)
+    if client is None:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key or not GENAI_AVAILABLE:
+            return None
+        with _gemini_model_lock:
+            client = _gemini_model if model_name == GEMINI_MODEL else _routed_models.get(model_name)
+            if client is None:
+                genai.configure(api_key=api_key)
+                client = genai.GenerativeModel(
+                    model_name,
+                    generation_config=_generation_config() or None
+                )
+                if model_name == GEMINI_MODEL:
+                    _gemini_model = client
+                else:
+                    _routed_models[model_name] = client
+    return client
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Timeouts, connection failures, rate limiting and server errors (not bad requests)."""
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    # google.api_core exceptions carry the HTTP status as `code`
+    return getattr(error, "code", None) in RETRYABLE_STATUS_CODES
+
+
+def retry_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (0-based)."""
+    return random.uniform(0, min(GEMINI_RETRY_MAX_DELAY, GEMINI_RETRY_BASE_DELAY * 2 ** attempt))
+
+
+async def call_gemini_async(request: Callable[[], Awaitable[T]], retries: Optional[int] = None,
+                            tokens: int = 0, model_name: str = GEMINI_MODEL) -> T:
+    """
+    Make a Gemini request, retrying transient errors, and report the outcome
+    to gemini_breaker and model_router. Each attempt first waits for
+    gemini_rate_limiter and is cancelled after GEMINI_TIMEOUT_SECONDS; the
+    request should also pass request_options() to the SDK.
     
-    try:
-        # Configure Gemini API
-        genai.configure(api_key=api_key)
+    Args:
+        request: Zero-argument coroutine function making the SDK call
+        retries: Retries of transient errors (default GEMINI_MAX_RETRIES)
+        tokens: Estimated tokens of the request (see estimate_request_tokens)
+        model_name: Model the request goes to, for the per-model metrics
         
-        # Initialize model (using gemini-2.5-flash - stable and fast)
-        model = genai.GenerativeModel('gemini-2.5-flash')
+    Returns:
+        The SDK response
         
-        # Create prompt for quiz generation
-        prompt = f"""You are an expert quiz generator. Based on the following Wikipedia article, create a quiz with exactly {num_questions} multiple-choice questions.
+    Raises:
+        RateLimitExceeded: If the request would queue too long for rate-limit capacity
+        Exception: The last error, once retries are exhausted or the error is not transient
+    """
+    retries = GEMINI_MAX_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        await gemini_rate_limiter.acquire(tokens)
+        started = time.monotonic()
+        try:
+            response = await asyncio.wait_for(request(), GEMINI_TIMEOUT_SECONDS)
+        except Exception as e:
+            model_router.record_error(model_name)
+            if not is_retryable_error(e):
+                raise
+            if attempt == retries or gemini_breaker.is_open():
+                gemini_breaker.record_failure()
+                raise
+            print(f"Gemini request failed ({str(e) or type(e).__name__}), retrying")
+            await asyncio.sleep(retry_delay(attempt))
+            continue
+        gemini_breaker.record_success()
+        usage = getattr(response, "usage_metadata", None)
+        gemini_rate_limiter.record_usage(tokens, getattr(usage, "total_token_count", None))
+        model_router.record_success(model_name, time.monotonic() - started, usage)
+        return response
 
-Article Title: {title}
 
-Article Content:
-{content[:4000]}
+def estimate_request_tokens(prompt: str, num_questions: int) -> int:
+    """Rough prompt + reply token count of a quiz request, for rate limiting."""
+    return int(len(prompt) * DEFAULT_TOKENS_PER_CHAR) + OUTPUT_TOKENS_BASE + num_questions * OUTPUT_TOKENS_PER_QUESTION
+
+
+def request_options(timeout: Optional[float] = None) -> Dict:
+    """SDK request options bounding a call by GEMINI_TIMEOUT_SECONDS (or `timeout`)."""
+    return {"timeout": timeout or GEMINI_TIMEOUT_SECONDS}
+
+
+# Bump whenever the prompt changes so cached LLM results are not reused
+PROMPT_VERSION = "2"
+
+# Static part of the quiz prompt, built once per process. Only the question
+# count, title and article text are appended per request, and keeping the
+# shared text first lets Gemini reuse it as a cached prefix.
+QUIZ_PROMPT_PREFIX = """You are an expert quiz generator. Based on the Wikipedia article at the end of this prompt, create a quiz of multiple-choice questions.
 
 Generate a JSON response with the following structure:
-{{
+{
     "summary": "A concise 2-3 sentence summary of the article",
     "questions": [
-        {{
+        {
             "question": "The question text",
             "options": ["Option A", "Option B", "Option C", "Option D"],
             "correct_answer": "The correct option text (must match one of the options exactly)",
             "explanation": "Brief explanation of why this is correct",
             "difficulty": "easy|medium|hard"
-        }}
+        }
     ],
     "related_topics": ["Related Topic 1", "Related Topic 2", "Related Topic 3", "Related Topic 4", "Related Topic 5"]
-}}
+}
 
 Requirements:
-- Generate exactly {num_questions} questions
+- Generate exactly the number of questions requested below
 - Each question must have exactly 4 options
 - Questions should cover different aspects of the article
 - Vary difficulty levels: include easy, medium, and hard questions
@@ -72,36 +223,479 @@ Requirements:
 - Ensure correct_answer matches one of the options exactly
 - Provide clear explanations
 - Generate 5-7 related Wikipedia topics for further reading (topics that are mentioned or related to the article)
+- Return ONLY the JSON, no additional text
+
+"""
+
+QUIZ_PROMPT_SUFFIX = """Number of questions: {num_questions}
+
+Article Title: {title}
+
+Article Content:
+{content}"""
+
+
+def build_quiz_prompt(content: str, title: str, num_questions: int) -> str:
+    """
+    Build the quiz generation prompt sent to Gemini.
+    
+    Args:
+        content: Wikipedia article content
+        title: Article title
+        num_questions: Number of questions to generate (5-10)
+        
+    Returns:
+        Prompt text
+    """
+    return QUIZ_PROMPT_PREFIX + QUIZ_PROMPT_SUFFIX.format(
+        num_questions=num_questions,
+        title=title,
+        content=content
+    )
+
+
+async def prompt_context_async(model, content: str, title: str) -> str:
+    """
+    Article text for the prompt, selected under the token budget.
+    Text that fits the budget by the default token/character ratio is used
+    as is; for longer text the ratio is measured with the model's token
+    counter (a rate-limited Gemini request) and the selection itself runs in
+    a worker thread.
+    """
+    if not QUIZ_CONTEXT_SELECTION or len(content) * DEFAULT_TOKENS_PER_CHAR <= QUIZ_CONTEXT_TOKEN_BUDGET:
+        return select_context(content, title)
+    tokens_per_char = DEFAULT_TOKENS_PER_CHAR
+    if not gemini_breaker.is_open():
+        try:
+            # Counting takes a request from the quota but no generation tokens
+            await gemini_rate_limiter.acquire(0, max_wait=COUNT_TOKENS_TIMEOUT_SECONDS)
+            response = await asyncio.wait_for(
+                model.count_tokens_async(content, request_options=request_options(COUNT_TOKENS_TIMEOUT_SECONDS)),
+                COUNT_TOKENS_TIMEOUT_SECONDS
+            )
+            tokens_per_char = response.total_tokens / max(len(content), 1)
+        except Exception as e:
+            print(f"Error counting tokens: {str(e) or type(e).__name__}")
+    return await asyncio.to_thread(select_context, content, title, tokens_per_char=tokens_per_char)
+
+
+def parse_quiz_response(response_text: str) -> Dict:
+    """
+    Parse Gemini's reply into quiz data.
+    
+    Args:
+        response_text: Raw model output, optionally wrapped in a markdown code block
+        
+    Returns:
+        Dictionary containing 'summary' and 'questions'
+        
+    Raises:
+        ValueError: If the reply is not a valid quiz
+    """
+    # Extract JSON from response (handle markdown code blocks)
+    if "```json" in response_text:
+        response_text = response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        response_text = response_text.split("```")[1].split("```")[0].strip()
+    
+    quiz_data = json.loads(response_text)
+    
+    # Validate structure
+    if "summary" not in quiz_data or "questions" not in quiz_data:
+        raise ValueError("Invalid quiz structure from AI")
+    
+    return quiz_data
+
+
+async def generate_quiz_with_gemini_async(content: str, title: str, num_questions: int = 5) -> Dict:
+    """
+    Generate quiz using Google Gemini AI model.
+    Awaits Gemini instead of blocking a worker thread for the whole round trip.
+    
+    Args:
+        content: Wikipedia article content
+        title: Article title
+        num_questions: Number of questions to generate (5-10)
+        
+    Returns:
+        Dictionary containing 'summary' and 'questions'
+    """
+    model_name = model_router.choose(len(content), num_questions)
+    model = get_gemini_model(model_name)
+    
+    if model is None:
+        return await generate_fallback_quiz_async(content, title, num_questions)
+    
+    if use_map_reduce(content, num_questions):
+        quiz_data = await generate_quiz_map_reduce_async(model, content, title, num_questions, model_name)
+        if quiz_data is not None:
+            return quiz_data
+    
+    cache_key = llm_cache.make_cache_key(content, title, num_questions, model_name, PROMPT_VERSION)
+    cached_quiz = await llm_cache.get_async(cache_key)
+    if cached_quiz is not None:
+        return cached_quiz
+    
+    if not gemini_breaker.allow_request():
+        # Gemini keeps failing; don't wait on it until the breaker lets a probe through
+        return await generate_fallback_quiz_async(content, title, num_questions)
+    
+    try:
+        context = await prompt_context_async(model, content, title)
+        prompt = build_quiz_prompt(context, title, num_questions)
+        
+        response = await call_gemini_async(
+            lambda: model.generate_content_async(prompt, request_options=request_options()),
+            tokens=estimate_request_tokens(prompt, num_questions),
+            model_name=model_name
+        )
+        quiz_data = parse_quiz_response(response.text)
+        quiz_data["generated_by"] = model_name
+        
+    except RateLimitExceeded:
+        # Callers answer 429 rather than serving a fallback quiz
+        raise
+    except Exception as e:
+        print(f"Error using Gemini API: {str(e)}")
+        return await generate_fallback_quiz_async(content, title, num_questions)
+    
+    await llm_cache.put_async(cache_key, quiz_data, model_name)
+    return quiz_data
+
+
+def use_map_reduce(content: str, num_questions: int) -> bool:
+    """Whether QUIZ_GENERATION_MODE asks for map-reduce generation of this article."""
+    if len(split_passages(content)) < 2:
+        return False
+    if QUIZ_GENERATION_MODE == "map_reduce":
+        return True
+    return QUIZ_GENERATION_MODE == "auto" and len(content) >= QUIZ_MAP_REDUCE_MIN_CHARS
+
+
+def split_sections(content: str, count: int) -> List[str]:
+    """
+    Split article text into up to `count` contiguous sections of similar length.
+    Paragraphs are never split.
+    """
+    passages = split_passages(content)
+    count = max(1, min(count, len(passages)))
+    total_length = sum(len(passage) for passage in passages)
+
+    sections, current, consumed = [], [], 0
+    for passage in passages:
+        # Start a new section once this paragraph's midpoint is past the next boundary
+        boundary = total_length * (len(sections) + 1) / count
+        if current and len(sections) < count - 1 and consumed + len(passage) / 2 > boundary:
+            sections.append("\n\n".join(current))
+            current = []
+        current.append(passage)
+        consumed += len(passage)
+    sections.append("\n\n".join(current))
+    return sections
+
+
+def _question_terms(question: Dict) -> set:
+    return set(re.findall(r"\w+", question.get("question", "").lower()))
+
 
-Return ONLY the JSON, no additional text."""
+def _is_duplicate(question: Dict, kept: List[Dict]) -> bool:
+    """Same correct answer and mostly the same wording as a kept question."""
+    terms = _question_terms(question)
+    answer = str(question.get("correct_answer", "")).strip().lower()
+    for other in kept:
+        other_terms = _question_terms(other)
+        overlap = len(terms & other_terms) / max(len(terms | other_terms), 1)
+        if overlap >= 0.8 or (overlap >= 0.5 and answer == str(other.get("correct_answer", "")).strip().lower()):
+            return True
+    return False
+
+
+def merge_section_quizzes(section_quizzes: List[Dict], num_questions: int) -> Dict:
+    """
+    Combine per-section quizzes into one quiz.
+    Questions are taken round-robin across sections (so every section is
+    covered), near-duplicates are dropped (and only used when there are not
+    enough other questions) and the difficulties are balanced as
+    easy/medium/hard in turn as far as the candidates allow. The summary
+    comes from the first section, related topics from all sections.
+    
+    Args:
+        section_quizzes: Parsed quizzes in article order
+        num_questions: Number of questions wanted
+        
+    Returns:
+        Dictionary containing 'summary', 'questions' and 'related_topics'
+    """
+    candidates = []
+    for round_index in range(max(len(quiz["questions"]) for quiz in section_quizzes)):
+        for section_index, quiz in enumerate(section_quizzes):
+            if round_index < len(quiz["questions"]):
+                candidates.append((section_index, round_index, quiz["questions"][round_index]))
+
+    unique, near_duplicates = [], []
+    for candidate in candidates:
+        if not _is_duplicate(candidate[2], [kept[2] for kept in unique]):
+            unique.append(candidate)
+        else:
+            near_duplicates.append(candidate)
+
+    picked = []
+    for slot in range(num_questions):
+        if not unique:
+            break
+        wanted = DIFFICULTIES[slot % len(DIFFICULTIES)]
+        match = next((c for c in unique if c[2].get("difficulty") == wanted), unique[0])
+        unique.remove(match)
+        picked.append(match)
+
+    # Top up with near-duplicates rather than fall short (exact repeats stay out)
+    for candidate in near_duplicates:
+        if len(picked) >= num_questions:
+            break
+        if all(candidate[2].get("question") != kept[2].get("question") for kept in picked):
+            picked.append(candidate)
+
+    # Present the questions in article order
+    picked.sort(key=lambda candidate: (candidate[0], candidate[1]))
+
+    related_topics = []
+    for quiz in section_quizzes:
+        for topic in quiz.get("related_topics", []):
+            if topic not in related_topics:
+                related_topics.append(topic)
+
+    return {
+        "summary": section_quizzes[0]["summary"],
+        "questions": [candidate[2] for candidate in picked],
+        "related_topics": related_topics[:7]
+    }
+
+
+async def generate_quiz_map_reduce_async(model, content: str, title: str, num_questions: int,
+                                         model_name: str = GEMINI_MODEL) -> Optional[Dict]:
+    """
+    Generate a quiz for a long article with parallel per-section Gemini calls.
+    The article is split into up to QUIZ_MAP_REDUCE_SECTIONS sections, each
+    section is asked for its share of the questions (plus a spare), and the
+    results are merged with merge_section_quizzes.
+    
+    Args:
+        model: Gemini model client
+        content: Full article text
+        title: Article title
+        num_questions: Number of questions to generate
+        model_name: Name of the model behind `model`
         
-        # Generate quiz
-        response = model.generate_content(prompt)
-        response_text = response.text
+    Returns:
+        Dictionary containing 'summary' and 'questions', or None when too few
+        questions survive even after one top-up call for the missing ones
+        (the caller then makes a single call)
+    """
+    sections = split_sections(content, min(QUIZ_MAP_REDUCE_SECTIONS, num_questions // 2))
+    cache_key = llm_cache.make_cache_key(
+        content, title, num_questions, model_name, f"{PROMPT_VERSION}:map_reduce:{len(sections)}"
+    )
+    cached_quiz = await llm_cache.get_async(cache_key)
+    if cached_quiz is not None:
+        return cached_quiz
+    if not gemini_breaker.allow_request():
+        return None
+
+    shares = [num_questions // len(sections)] * len(sections)
+    for index in range(num_questions % len(sections)):
+        shares[index] += 1
+
+    async def generate_section(section: str, share: int) -> Dict:
+        context = await prompt_context_async(model, section, title)
+        prompt = build_quiz_prompt(context, title, share + MAP_REDUCE_EXTRA_QUESTIONS)
+        response = await call_gemini_async(
+            lambda: model.generate_content_async(prompt, request_options=request_options()),
+            tokens=estimate_request_tokens(prompt, share + MAP_REDUCE_EXTRA_QUESTIONS),
+            model_name=model_name
+        )
+        return parse_quiz_response(response.text)
+
+    results = await asyncio.gather(
+        *[generate_section(section, share) for section, share in zip(sections, shares)],
+        return_exceptions=True
+    )
+    section_quizzes, failed_sections = [], []
+    top_up_position = None  # Where the top-up quiz goes to keep article order
+    for section, result in zip(sections, results):
+        if isinstance(result, Exception):
+            print(f"Error using Gemini API: {str(result)}")
+            failed_sections.append(section)
+            if top_up_position is None:
+                top_up_position = len(section_quizzes)
+        else:
+            section_quizzes.append(result)
+
+    if not section_quizzes:
+        rate_limited = [result for result in results if isinstance(result, RateLimitExceeded)]
+        if rate_limited:
+            raise rate_limited[0]
+        return None
+    quiz_data = merge_section_quizzes(section_quizzes, num_questions)
+    missing = num_questions - len(quiz_data["questions"])
+    if missing > 0:
+        # One small call for the missing questions, from the failed sections if any
+        print(f"Map-reduce produced {len(quiz_data['questions'])} of {num_questions} questions, topping up")
+        try:
+            top_up = await generate_section("\n\n".join(failed_sections) or content, missing)
+            section_quizzes.insert(len(section_quizzes) if top_up_position is None else top_up_position, top_up)
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            print(f"Error using Gemini API: {str(e)}")
+            return None
+        quiz_data = merge_section_quizzes(section_quizzes, num_questions)
+        if len(quiz_data["questions"]) < num_questions:
+            return None
+
+    quiz_data["generated_by"] = model_name
+    await llm_cache.put_async(cache_key, quiz_data, model_name)
+    return quiz_data
+
+
+class IncrementalQuizParser:
+    """
+    Incremental scanner over a streamed quiz JSON reply.
+
+    feed() takes the next chunk of model output and returns the parts that
+    became complete: ("summary", text) once the summary string has closed and
+    ("question", dict) for each finished object in the questions array. Text
+    before the opening brace (e.g. a ```json fence) is ignored. The full
+    reply is still parsed with parse_quiz_response at the end.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._question_start: Optional[int] = None
+
+    def feed(self, text: str) -> List[tuple]:
+        self._buffer += text
+        events = []
+        buffer = self._buffer
+        for pos in range(self._pos, len(buffer)):
+            char = buffer[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._end_string(buffer[self._string_start:pos + 1], events)
+                continue
+
+            if char == '"' and self._depth:
+                self._in_string = True
+                self._string_start = pos
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._expect_key = True
+                elif self._depth == 3 and char == "{" and self._key == "questions":
+                    self._question_start = pos
+            elif char in "}]" and self._depth:
+                self._depth -= 1
+                if self._depth == 2 and self._question_start is not None:
+                    events.append(("question", json.loads(buffer[self._question_start:pos + 1])))
+                    self._question_start = None
+            elif char == "," and self._depth == 1:
+                self._expect_key = True
+        self._pos = len(buffer)
+        return events
+
+    def _end_string(self, literal: str, events: List[tuple]):
+        if self._depth != 1:
+            return
+        if self._expect_key:
+            self._key = json.loads(literal)
+            self._expect_key = False
+        elif self._key == "summary":
+            events.append(("summary", json.loads(literal)))
+
+
+async def generate_quiz_streaming_async(content: str, title: str, num_questions: int = 5,
+                                        on_event: Optional[Callable[[str, object], None]] = None) -> Dict:
+    """
+    Generate a quiz with Gemini's streamed output, reporting parts early.
+    on_event("summary", text) and on_event("question", dict) are called as
+    soon as each part of the reply is complete. Cached results, the fallback
+    generator and errors produce no partial events; the returned quiz is
+    always the authoritative result.
+    
+    Args:
+        content: Wikipedia article content
+        title: Article title
+        num_questions: Number of questions to generate (5-10)
+        on_event: Callback for completed parts of the quiz
         
-        # Extract JSON from response (handle markdown code blocks)
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
+    Returns:
+        Dictionary containing 'summary' and 'questions'
+    """
+    model_name = model_router.choose(len(content), num_questions)
+    model = get_gemini_model(model_name)
+    
+    if model is None:
+        return await generate_fallback_quiz_async(content, title, num_questions)
+    
+    cache_key = llm_cache.make_cache_key(content, title, num_questions, model_name, PROMPT_VERSION)
+    cached_quiz = await llm_cache.get_async(cache_key)
+    if cached_quiz is not None:
+        return cached_quiz
+    
+    if not gemini_breaker.allow_request():
+        # Gemini keeps failing; don't wait on it until the breaker lets a probe through
+        return await generate_fallback_quiz_async(content, title, num_questions)
+    
+    try:
+        context = await prompt_context_async(model, content, title)
+        prompt = build_quiz_prompt(context, title, num_questions)
         
-        quiz_data = json.loads(response_text)
+        parser = IncrementalQuizParser()
+        chunks = []
         
-        # Validate structure
-        if "summary" not in quiz_data or "questions" not in quiz_data:
-            raise ValueError("Invalid quiz structure from AI")
+        async def stream_reply():
+            response = await model.generate_content_async(prompt, stream=True, request_options=request_options())
+            async for chunk in response:
+                chunks.append(chunk.text)
+                for kind, data in parser.feed(chunk.text):
+                    if on_event:
+                        on_event(kind, data)
+            return response
         
-        return quiz_data
+        # Not retried: parts of the reply may already have been reported
+        await call_gemini_async(
+            stream_reply, retries=0,
+            tokens=estimate_request_tokens(prompt, num_questions), model_name=model_name
+        )
+        quiz_data = parse_quiz_response("".join(chunks))
+        quiz_data["generated_by"] = model_name
         
+    except RateLimitExceeded:
+        raise
     except Exception as e:
         print(f"Error using Gemini API: {str(e)}")
-        return generate_fallback_quiz(content, title, num_questions)
+        return await generate_fallback_quiz_async(content, title, num_questions)
+    
+    await llm_cache.put_async(cache_key, quiz_data, model_name)
+    return quiz_data
 
 
 def generate_fallback_quiz(content: str, title: str, num_questions: int = 5) -> Dict:
     """
     Fallback quiz generator when Gemini API is not available.
-    Creates a simple rule-based quiz from the content.
+    Uses the local fill-in-the-blank generator, or a simple rule-based quiz
+    when the article is too short for it.
     
     Args:
         content: Wikipedia article content
@@ -109,8 +703,13 @@ def generate_fallback_quiz(content: str, title: str, num_questions: int = 5) ->
         num_questions: Number of questions to generate
         
     Returns:
-        Dictionary containing 'summary' and 'questions'
+        Dictionary containing 'summary' and 'questions', tagged with
+        'generated_by': LOCAL_GENERATOR
     """
+    quiz_data = generate_local_quiz(content, title, num_questions)
+    if quiz_data is not None:
+        return {**quiz_data, "generated_by": LOCAL_GENERATOR}
+
     # Generate simple summary (first 2 sentences)
     sentences = content.split('.')
     summary = '. '.join(sentences[:2]).strip() + '.'
@@ -170,11 +769,17 @@ def generate_fallback_quiz(content: str, title: str, num_questions: int = 5) ->
     return {
         "summary": summary if summary else f"This article is about {title}.",
         "questions": questions[:num_questions],
-        "related_topics": related_topics[:7]
+        "related_topics": related_topics[:7],
+        "generated_by": LOCAL_GENERATOR
     }
 
 
-def generate_quiz(content: str, title: str, num_questions: int = 5) -> Dict:
+async def generate_fallback_quiz_async(content: str, title: str, num_questions: int = 5) -> Dict:
+    """Async version of generate_fallback_quiz; runs it in a worker thread."""
+    return await asyncio.to_thread(generate_fallback_quiz, content, title, num_questions)
+
+
+async def generate_quiz_async(content: str, title: str, num_questions: int = 5) -> Dict:
     """
     Main function to generate quiz. Tries Gemini first, falls back if needed.
     
@@ -186,4 +791,4 @@ def generate_quiz(content: str, title: str, num_questions: int = 5) -> Dict:
     Returns:
         Dictionary containing 'summary' and 'questions'
     """
-    return generate_quiz_with_gemini(content, title, num_questions)
+    return await generate_quiz_with_gemini_async(content, title, num_questions)
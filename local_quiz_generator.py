@@ -0,0 +1,198 @@
+"""
+Fast local quiz generator (no LLM)
+
+Builds fill-in-the-blank questions from the article itself: informative
+sentences are picked, a year, number, name or key term in each is blanked
+out, and the distractors are other values of the same kind mined from the
+article. Used when Gemini is unavailable or too slow. Output is
+deterministic per article.
+"""
+
+import hashlib
+import random
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from context_selection import STOPWORDS, WORD_PATTERN
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+YEAR_PATTERN = re.compile(r"\b(1[0-9]{3}|20[0-9]{2})\b")
+NUMBER_PATTERN = re.compile(r"\b\d+(?:[.,]\d+)?\b")
+# Runs of capitalized words, e.g. "Robert Stevenson" or "Bell Rock"
+NAME_PATTERN = re.compile(r"\b[A-Z][a-z]+(?:(?:-|\s+(?:of\s+|de\s+)?)[A-Z][a-z]+)*\b")
+LEADING_WORDS = ("The ", "A ", "An ", "In ", "By ", "On ", "At ")
+# Footnote markers such as [12] left over from the page
+FOOTNOTE_PATTERN = re.compile(r"\[\d+\]")
+
+# Value of a quiz's "generated_by" when it did not come from the LLM
+LOCAL_GENERATOR = "local"
+
+MIN_TERM_CHARS = 6
+MIN_SENTENCE_CHARS = 60
+MAX_SENTENCE_CHARS = 260
+BLANK = "_____"
+# Name and term distractors are drawn from this many of the article's most frequent ones
+DISTRACTOR_POOL_SIZE = 20
+
+
+def split_sentences(content: str) -> List[str]:
+    """Sentences of the article text, footnote markers removed."""
+    text = FOOTNOTE_PATTERN.sub("", content)
+    sentences = []
+    for paragraph in text.split("\n\n"):
+        sentences.extend(s.strip() for s in SENTENCE_PATTERN.split(paragraph.strip()) if s.strip())
+    return sentences
+
+
+def _names(sentence: str) -> List[str]:
+    """Capitalized names in a sentence, ignoring the sentence's first word."""
+    names = []
+    for match in NAME_PATTERN.finditer(sentence):
+        name = match.group()
+        if match.start() == 0:
+            # A capitalized first word is usually just the start of the sentence
+            name = name[len(next((w for w in LEADING_WORDS if name.startswith(w)), "")):]
+            if " " not in name and "-" not in name:
+                continue
+        if len(name) > 3:
+            names.append(name)
+    return names
+
+
+def _terms(sentence: str) -> List[str]:
+    """Longer lowercase content words of a sentence."""
+    return [
+        word for word in WORD_PATTERN.findall(sentence)
+        if len(word) >= MIN_TERM_CHARS and word.islower() and word not in STOPWORDS
+    ]
+
+
+def _candidates(sentence: str, term_counts: Counter) -> List[Tuple[str, str]]:
+    """(kind, answer) pairs that could be blanked out, best first."""
+    candidates = [("year", year) for year in YEAR_PATTERN.findall(sentence)]
+    candidates += [("name", name) for name in _names(sentence)]
+    candidates += [
+        ("number", number) for number in NUMBER_PATTERN.findall(sentence)
+        if not YEAR_PATTERN.fullmatch(number)
+    ]
+    # Key terms: longer words the article uses more than once, longest first
+    terms = sorted(set(_terms(sentence)), key=lambda term: (-len(term), term))
+    candidates += [("term", term) for term in terms if term_counts[term] > 1]
+    return candidates
+
+
+def _mentions_title(value: str, title_words: List[str]) -> bool:
+    return any(value.lower().startswith(word) for word in title_words)
+
+
+def _ranked_distractors(answer: str, counts: Counter, sentence: str, title_words: List[str],
+                        rng: random.Random, count: int) -> List[str]:
+    """A sample of the article's most frequent values of the same kind, none of them in the sentence."""
+    pool = [
+        value for value, _ in counts.most_common(DISTRACTOR_POOL_SIZE + count)
+        if value != answer and value not in sentence and not _mentions_title(value, title_words)
+    ][:DISTRACTOR_POOL_SIZE]
+    return rng.sample(pool, min(count, len(pool)))
+
+
+def _numeric_distractors(answer: str, pool: List[str], rng: random.Random, count: int) -> List[str]:
+    """Other values of the same kind from the article, then nearby made-up values."""
+    distractors = [value for value in dict.fromkeys(pool) if value != answer]
+    rng.shuffle(distractors)
+    distractors = distractors[:count]
+    if "." in answer or "," in answer:
+        return distractors
+    base = int(answer)
+    offsets = [o for o in (-10, -5, -3, -2, -1, 1, 2, 3, 5, 10) if base + o >= 0]
+    rng.shuffle(offsets)
+    for offset in offsets:
+        if len(distractors) >= count:
+            break
+        value = str(base + offset)
+        if value not in distractors and value != answer:
+            distractors.append(value)
+    return distractors
+
+
+def generate_local_quiz(content: str, title: str, num_questions: int = 5) -> Optional[Dict]:
+    """
+    Generate a fill-in-the-blank quiz from the article text.
+
+    Args:
+        content: Wikipedia article content
+        title: Article title
+        num_questions: Number of questions to generate
+
+    Returns:
+        Dictionary containing 'summary', 'questions' and 'related_topics',
+        or None if the article does not yield enough questions
+    """
+    rng = random.Random(hashlib.sha256(f"{title}\n{content}".encode("utf-8")).digest())
+    sentences = split_sentences(content)
+
+    term_counts = Counter(term for sentence in sentences for term in _terms(sentence))
+    pools = {"year": [], "number": [], "name": []}
+    for sentence in sentences:
+        for kind, answer in _candidates(sentence, Counter()):
+            pools[kind].append(answer)
+    counts = {kind: Counter(pool) for kind, pool in pools.items()}
+    counts["term"] = term_counts
+    title_words = [word for word in title.lower().split() if len(word) > 3]
+
+    eligible = []
+    for position, sentence in enumerate(dict.fromkeys(sentences)):
+        if MIN_SENTENCE_CHARS <= len(sentence) <= MAX_SENTENCE_CHARS:
+            candidates = [
+                (kind, answer) for kind, answer in _candidates(sentence, term_counts)
+                if not _mentions_title(answer, title_words)
+            ]
+            if candidates:
+                eligible.append((position, sentence, candidates))
+
+    # Spread the questions over the whole article, then fill any gaps in order
+    spread = [len(eligible) * i // num_questions for i in range(num_questions)] if eligible else []
+    order = list(dict.fromkeys(spread + list(range(len(eligible)))))
+
+    questions = []
+    used_answers = set()
+    for index in order:
+        if len(questions) >= num_questions:
+            break
+        position, sentence, candidates = eligible[index]
+        for kind, answer in candidates:
+            if answer in used_answers:
+                continue
+            if kind in ("year", "number"):
+                distractors = _numeric_distractors(answer, pools[kind], rng, 3)
+            else:
+                distractors = _ranked_distractors(answer, counts[kind], sentence, title_words, rng, 3)
+            if len(distractors) < 3:
+                continue
+
+            blanked = re.sub(rf"\b{re.escape(answer)}\b", BLANK, sentence, count=1)
+            options = distractors + [answer]
+            rng.shuffle(options)
+            # Answers the article keeps repeating are easier than one-off details
+            mentions = counts[kind][answer]
+            difficulty = "easy" if mentions >= 5 else "medium" if mentions >= 2 else "hard"
+            questions.append((position, {
+                "question": f"Fill in the blank: {blanked}",
+                "options": options,
+                "correct_answer": answer,
+                "explanation": f"The article states: \"{sentence}\"",
+                "difficulty": difficulty
+            }))
+            used_answers.add(answer)
+            break
+
+    if len(questions) < num_questions:
+        return None
+
+    return {
+        "summary": " ".join(sentences[:2]) if sentences else f"This article is about {title}.",
+        "questions": [question for _, question in sorted(questions, key=lambda item: item[0])],
+        "related_topics": [
+            name for name, _ in counts["name"].most_common() if not _mentions_title(name, title_words)
+        ][:5]
+    }
@@ -1,15 +1,30 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional
+import base64
 import json
-from typing import List
+import math
 import os
+import random
 import uvicorn
 
-from database import get_db, init_db, Quiz
-from models import QuizCreate, QuizResponse, QuizSummary, QuizGenerationRequest, QuestionSchema
-from scraper import scrape_wikipedia, validate_wikipedia_url
-from llm_quiz_generator import generate_quiz
+from database import get_db, init_db, async_engine, Quiz, Question
+from models import QuizCreate, QuizResponse, QuizSummary, QuizGenerationRequest, JobResponse
+from models import BatchQuizRequest, BatchQuizResult, BatchQuizResponse, QuizOverview, QuestionItem
+from scraper import validate_wikipedia_url, close_http_clients
+from quiz_service import get_or_create_quiz, generate_quiz_batch, stream_quiz_events
+from jobs import JobManager, QueueFullError
+import llm_cache
+import quiz_cache
+import quiz_service
+from quiz_json import build_quiz_json
+from llm_quiz_generator import gemini_breaker, model_router
+from local_quiz_generator import LOCAL_GENERATOR
+from rate_limiter import gemini_priority, gemini_rate_limiter, BACKGROUND
 
 # -----------------------------------------------------------
 # Initialize FastAPI app
@@ -29,6 +44,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # -----------------------------------------------------------
@@ -38,6 +54,32 @@ app.add_middleware(
 def startup_event():
     init_db()
     print("✅ Database initialized successfully")
+    pruned = llm_cache.prune()
+    if pruned:
+        print(f"🧹 Pruned {pruned} expired LLM cache entries")
+
+
+async def run_quiz_job(job):
+    # Jobs yield Gemini capacity to interactive requests
+    with gemini_priority(BACKGROUND):
+        return await get_or_create_quiz(job.wikipedia_url, job.num_questions)
+
+
+# Background generation jobs run on a bounded worker pool
+job_manager = JobManager(run_quiz_job)
+
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_manager.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_manager.stop()
+    await quiz_service.stop_upgrades()
+    await close_http_clients()
+    await async_engine.dispose()
 
 # -----------------------------------------------------------
 # Root endpoint
@@ -50,8 +92,16 @@ def read_root():
         "version": "1.0.0",
         "endpoints": {
             "generate_quiz": "POST /generate_quiz",
-            "get_history": "GET /history",
-            "get_quiz": "GET /quiz/{quiz_id}"
+            "generate_quiz_batch": "POST /generate_quiz/batch",
+            "stream_quiz": "GET /generate_quiz/stream?wikipedia_url=...&num_questions=5",
+            "submit_job": "POST /jobs/generate_quiz",
+            "get_job": "GET /jobs/{job_id}",
+            "get_history": "GET /history?limit=50&cursor=...",
+            "get_quiz": "GET /quiz/{quiz_id}",
+            "get_quiz_summary": "GET /quiz/{quiz_id}/summary",
+            "list_questions": "GET /questions?difficulty=hard&limit=50&cursor=...",
+            "random_questions": "GET /questions/random?count=10&difficulty=hard",
+            "metrics": "GET /metrics"
         }
     }
 
@@ -59,12 +109,12 @@ def read_root():
 # Generate quiz endpoint
 # -----------------------------------------------------------
 @app.post("/generate_quiz", response_model=QuizResponse)
-def generate_quiz_endpoint(
-    request: QuizGenerationRequest,
-    db: Session = Depends(get_db)
-):
+async def generate_quiz_endpoint(request: QuizGenerationRequest):
     """
     Generate a quiz from a Wikipedia URL.
+    Returns the stored quiz instead when the same article was already
+    quizzed with the same number of questions and has not changed since.
+    Concurrent requests for the same article share one generation.
     """
     try:
         # Validate URL
@@ -74,106 +124,297 @@ def generate_quiz_endpoint(
                 detail="Invalid Wikipedia URL. Must be a valid Wikipedia article URL."
             )
 
-        # Scrape Wikipedia article
-        try:
-            article_data = scrape_wikipedia(request.wikipedia_url)
-        except Exception as e:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Failed to scrape Wikipedia article: {str(e)}"
-            )
+        quiz = await get_or_create_quiz(request.wikipedia_url, request.num_questions)
 
-        # Generate quiz using AI
-        try:
-            quiz_data = generate_quiz(
-                content=article_data["content"],
-                title=article_data["title"],
-                num_questions=request.num_questions
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to generate quiz: {str(e)}"
-            )
+        # Stored and reused quizzes carry their serialized response
+        return Response(content=quiz.response_json, media_type="application/json")
 
-        # Save to database
-        quiz_db = Quiz(
-            url=request.wikipedia_url,
-            title=article_data["title"],
-            scraped_content=article_data["content"][:1000],
-            full_quiz_data=json.dumps({
-                "summary": quiz_data["summary"],
-                "questions": quiz_data["questions"],
-                "related_topics": quiz_data.get("related_topics", [])
-            })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
         )
 
-        db.add(quiz_db)
-        db.commit()
-        db.refresh(quiz_db)
-
-        # Return response
-        return QuizResponse(
-            id=quiz_db.id,
-            wikipedia_url=quiz_db.url,
-            title=quiz_db.title,
-            summary=quiz_data["summary"],
-            questions=[QuestionSchema(**q) for q in quiz_data["questions"]],
-            related_topics=quiz_data.get("related_topics", []),
-            created_at=quiz_db.date_generated
+# -----------------------------------------------------------
+# Batch quiz generation
+# -----------------------------------------------------------
+@app.post("/generate_quiz/batch", response_model=BatchQuizResponse)
+async def generate_quiz_batch_endpoint(request: BatchQuizRequest):
+    """
+    Generate quizzes for up to 200 Wikipedia URLs in one call.
+    Duplicate articles are generated once, and every item gets its own
+    result: the quiz, or the error status and message for that URL.
+    """
+    try:
+        outcomes = await generate_quiz_batch(
+            [(item.wikipedia_url, item.num_questions) for item in request.items]
         )
-
-    except HTTPException:
-        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
 
+    results = []
+    for item, outcome in zip(request.items, outcomes):
+        if isinstance(outcome, HTTPException):
+            results.append(BatchQuizResult(
+                wikipedia_url=item.wikipedia_url,
+                num_questions=item.num_questions,
+                status_code=outcome.status_code,
+                error=outcome.detail
+            ))
+        else:
+            results.append(BatchQuizResult(
+                wikipedia_url=item.wikipedia_url,
+                num_questions=item.num_questions,
+                status_code=200,
+                quiz=outcome
+            ))
+
+    failed = sum(1 for result in results if result.error is not None)
+    return BatchQuizResponse(results=results, succeeded=len(results) - failed, failed=failed)
+
+# -----------------------------------------------------------
+# Streaming quiz generation (Server-Sent Events)
+# -----------------------------------------------------------
+def sse_event(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+@app.get("/generate_quiz/stream")
+async def stream_quiz_endpoint(
+    wikipedia_url: str,
+    num_questions: int = Query(default=5, ge=5, le=10, description="Number of questions (5-10)")
+):
+    """
+    Generate a quiz and stream it as Server-Sent Events.
+    Sends a `summary` event and one `question` event per question as soon as
+    Gemini has produced them, then a `quiz` event with the stored quiz (same
+    shape as POST /generate_quiz), which is authoritative. A `reset` event
+    means the questions sent so far are not part of the stored quiz and
+    should be discarded; its summary and questions follow. Failures are sent
+    as an `error` event with status_code and detail (and retry_after for 429).
+    """
+    if not validate_wikipedia_url(wikipedia_url):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid Wikipedia URL. Must be a valid Wikipedia article URL."
+        )
+
+    async def event_stream():
+        try:
+            async for kind, data in stream_quiz_events(wikipedia_url, num_questions):
+                if kind == "quiz":
+                    yield sse_event("quiz", data.model_dump_json())
+                elif kind == "summary":
+                    yield sse_event("summary", json.dumps({"summary": data}))
+                elif kind == "reset":
+                    yield sse_event("reset", "{}")
+                else:
+                    yield sse_event("question", json.dumps(data))
+        except HTTPException as e:
+            error = {"status_code": e.status_code, "detail": e.detail}
+            if e.headers and "Retry-After" in e.headers:
+                error["retry_after"] = int(e.headers["Retry-After"])
+            yield sse_event("error", json.dumps(error))
+        except Exception as e:
+            yield sse_event("error", json.dumps({"status_code": 500, "detail": f"Internal server error: {str(e)}"}))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# -----------------------------------------------------------
+# Background generation jobs
+# -----------------------------------------------------------
+def job_to_response(job) -> JobResponse:
+    return JobResponse(
+        job_id=job.id,
+        status=job.status,
+        wikipedia_url=job.wikipedia_url,
+        num_questions=job.num_questions,
+        result=job.result,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at
+    )
+
+
+@app.post("/jobs/generate_quiz", response_model=JobResponse, status_code=202)
+async def submit_quiz_job(request: QuizGenerationRequest, response: Response):
+    """
+    Queue quiz generation and return immediately with a job id.
+    Poll GET /jobs/{job_id} for the status and, once it succeeded, the quiz.
+    """
+    if not validate_wikipedia_url(request.wikipedia_url):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid Wikipedia URL. Must be a valid Wikipedia article URL."
+        )
+
+    try:
+        job = job_manager.submit(request.wikipedia_url, request.num_questions)
+    except QueueFullError:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many quiz generation jobs queued, try again later",
+            headers={"Retry-After": "5"}
+        )
+
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job_to_response(job)
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_quiz_job(job_id: str):
+    """Get the status of a quiz generation job, with the quiz once it is done."""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job_to_response(job)
+
 # -----------------------------------------------------------
 # Get quiz history
 # -----------------------------------------------------------
+# Page size of /history when no limit is given, and the largest allowed
+HISTORY_DEFAULT_LIMIT = 50
+HISTORY_MAX_LIMIT = 200
+
+
+def encode_history_cursor(date_generated: datetime, quiz_id: int) -> str:
+    """Opaque cursor pointing just after the given quiz in /history order."""
+    raw = f"{date_generated.isoformat()}|{quiz_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_history_cursor(cursor: str):
+    """Inverse of encode_history_cursor. Raises ValueError for malformed cursors."""
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    date_text, id_text = raw.split("|")
+    return datetime.fromisoformat(date_text), int(id_text)
+
+
 @app.get("/history", response_model=List[QuizSummary])
-def get_quiz_history(db: Session = Depends(get_db)):
-    """Get all saved quiz summaries (without full questions)."""
+def get_quiz_history(
+    response: Response,
+    limit: int = Query(default=HISTORY_DEFAULT_LIMIT, ge=1, le=HISTORY_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get saved quiz summaries (without full questions), newest first.
+    Returns at most `limit` quizzes. When there are more, the X-Next-Cursor
+    response header holds the `cursor` value for the next page.
+    """
+    query = (
+        select(Quiz.id, Quiz.url, Quiz.title, Quiz.date_generated)
+        .order_by(Quiz.date_generated.desc(), Quiz.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        try:
+            after_date, after_id = decode_history_cursor(cursor)
+        except (ValueError, UnicodeDecodeError):
+            raise HTTPException(status_code=400, detail="Invalid history cursor")
+        query = query.where(tuple_(Quiz.date_generated, Quiz.id) < tuple_(after_date, after_id))
+
     try:
-        quizzes = db.query(Quiz).order_by(Quiz.date_generated.desc()).all()
-        return [
-            QuizSummary(
-                id=quiz.id,
-                wikipedia_url=quiz.url,
-                title=quiz.title,
-                created_at=quiz.date_generated
-            )
-            for quiz in quizzes
-        ]
+        rows = db.execute(query).all()
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to retrieve quiz history: {str(e)}"
         )
 
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_history_cursor(last.date_generated, last.id)
+
+    return [
+        QuizSummary(
+            id=row.id,
+            wikipedia_url=row.url,
+            title=row.title,
+            created_at=row.date_generated
+        )
+        for row in rows
+    ]
+
 # -----------------------------------------------------------
 # Get quiz by ID
 # -----------------------------------------------------------
 @app.get("/quiz/{quiz_id}", response_model=QuizResponse)
 def get_quiz_by_id(quiz_id: int, db: Session = Depends(get_db)):
-    """Get full quiz details by ID."""
+    """
+    Get full quiz details by ID.
+    Served as pre-serialized JSON: from the hot quiz cache when possible,
+    otherwise from the quiz's stored response_json.
+    """
+    cached_body = quiz_cache.get_quiz_json(quiz_id)
+    if cached_body is not None:
+        return Response(content=cached_body, media_type="application/json")
+
+    try:
+        row = db.query(Quiz.id, Quiz.generated_by, Quiz.response_json).filter(Quiz.id == quiz_id).first()
+        if not row:
+            raise HTTPException(status_code=404, detail=f"Quiz with ID {quiz_id} not found")
+
+        if row.response_json is not None:
+            body = bytes(row.response_json)
+        else:
+            # Quizzes stored before response_json existed are serialized once
+            quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+            body = build_quiz_json(quiz.id, quiz.url, quiz.title, quiz.full_quiz_data, quiz.date_generated)
+            quiz.response_json = body
+            db.commit()
+
+        if row.generated_by != LOCAL_GENERATOR:
+            # Local quizzes may still be upgraded (see quiz_cache)
+            quiz_cache.put_quiz_json(quiz_id, body)
+        return Response(content=body, media_type="application/json")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve quiz: {str(e)}"
+        )
+
+# -----------------------------------------------------------
+# Get quiz summary by ID (without questions)
+# -----------------------------------------------------------
+@app.get("/quiz/{quiz_id}/summary", response_model=QuizOverview)
+def get_quiz_summary(quiz_id: int, db: Session = Depends(get_db)):
+    """Get a quiz's summary and related topics; the questions are not loaded."""
     try:
-        quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
-        if not quiz:
+        row = db.execute(
+            select(
+                Quiz.id,
+                Quiz.url,
+                Quiz.title,
+                Quiz.date_generated,
+                Quiz.full_quiz_data["summary"].as_string().label("summary"),
+                Quiz.full_quiz_data["related_topics"].label("related_topics")
+            ).where(Quiz.id == quiz_id)
+        ).first()
+        if not row:
             raise HTTPException(status_code=404, detail=f"Quiz with ID {quiz_id} not found")
 
-        quiz_data = json.loads(quiz.full_quiz_data)
-        return QuizResponse(
-            id=quiz.id,
-            wikipedia_url=quiz.url,
-            title=quiz.title,
-            summary=quiz_data.get("summary", ""),
-            questions=[QuestionSchema(**q) for q in quiz_data.get("questions", [])],
-            related_topics=quiz_data.get("related_topics", []),
-            created_at=quiz.date_generated
+        return QuizOverview(
+            id=row.id,
+            wikipedia_url=row.url,
+            title=row.title,
+            summary=row.summary or "",
+            related_topics=row.related_topics or [],
+            created_at=row.date_generated
         )
 
     except HTTPException:
@@ -185,5 +426,142 @@ def get_quiz_by_id(quiz_id: int, db: Session = Depends(get_db)):
         )
 
 
+# -----------------------------------------------------------
+# Question-level queries
+# -----------------------------------------------------------
+QUESTION_COLUMNS = (
+    Question.id, Question.quiz_id, Question.position, Question.text,
+    Question.options, Question.correct_answer, Question.explanation, Question.difficulty
+)
+
+# /questions/random probes at most this many random ids per query, in up to
+# RANDOM_SAMPLE_ROUNDS queries
+RANDOM_SAMPLE_MAX_PROBES = 1000
+RANDOM_SAMPLE_ROUNDS = 3
+
+
+def question_to_item(row) -> QuestionItem:
+    return QuestionItem(
+        id=row.id,
+        quiz_id=row.quiz_id,
+        position=row.position,
+        question=row.text,
+        options=row.options,
+        correct_answer=row.correct_answer,
+        explanation=row.explanation,
+        difficulty=row.difficulty
+    )
+
+
+@app.get("/questions", response_model=List[QuestionItem])
+def list_questions(
+    response: Response,
+    difficulty: Optional[str] = None,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    List questions across all quizzes, optionally of one difficulty.
+    Paginated like /history: pass the X-Next-Cursor header value as `cursor`.
+    """
+    query = select(*QUESTION_COLUMNS).order_by(Question.id).limit(limit + 1)
+    if difficulty:
+        query = query.where(Question.difficulty == difficulty)
+    if cursor is not None:
+        query = query.where(Question.id > cursor)
+
+    try:
+        rows = db.execute(query).all()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve questions: {str(e)}"
+        )
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return [question_to_item(row) for row in rows]
+
+
+@app.get("/questions/random", response_model=List[QuestionItem])
+def random_questions(
+    count: int = Query(default=10, ge=1, le=50),
+    difficulty: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Sample random questions across all quizzes, optionally of one difficulty.
+    Random ids are probed in batches with an indexed IN lookup instead of
+    sorting the whole table by random(); probes that hit an id gap (or a
+    question of another difficulty) are redrawn, so every question is
+    equally likely. Fewer than `count` are returned if there are not enough
+    questions.
+    """
+    try:
+        filters = [Question.difficulty == difficulty] if difficulty else []
+        low, high = db.execute(
+            select(func.min(Question.id), func.max(Question.id)).where(*filters)
+        ).one()
+        if low is None:
+            return []
+
+        sampled = {}
+        probed = set()
+        hit_rate = 1.0
+        for _ in range(RANDOM_SAMPLE_ROUNDS):
+            needed = count - len(sampled)
+            untried = high - low + 1 - len(probed)
+            if needed <= 0 or untried <= 0:
+                break
+            # Draw enough ids to fill the sample at the hit rate seen so far
+            draw = min(math.ceil(needed * 1.5 / max(hit_rate, 0.01)), RANDOM_SAMPLE_MAX_PROBES, untried)
+            ids = [i for i in random.sample(range(low, high + 1), min(draw + len(probed), high - low + 1))
+                   if i not in probed][:draw]
+            probed.update(ids)
+            rows = db.execute(select(*QUESTION_COLUMNS).where(Question.id.in_(ids), *filters)).all()
+            hit_rate = len(rows) / len(ids)
+            for row in random.sample(rows, min(needed, len(rows))):
+                sampled[row.id] = row
+
+        needed = count - len(sampled)
+        if needed > 0 and len(probed) < high - low + 1:
+            # Sparse ids: pick the rest among the questions not yet probed
+            rows = db.execute(
+                select(*QUESTION_COLUMNS)
+                .where(Question.id.not_in(probed), *filters)
+                .order_by(func.random())
+                .limit(needed)
+            ).all()
+            for row in rows:
+                sampled[row.id] = row
+        return [question_to_item(row) for row in random.sample(list(sampled.values()), len(sampled))]
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to sample questions: {str(e)}"
+        )
+
+
+# -----------------------------------------------------------
+# Metrics
+# -----------------------------------------------------------
+@app.get("/metrics")
+async def get_metrics():
+    """Cache, coalescing, deadline hedging, Gemini circuit breaker/rate limiter, per-model and job queue counters for monitoring."""
+    return {
+        "quiz_cache": quiz_cache.quiz_response_cache.stats(),
+        "llm_cache": llm_cache.memory_cache.stats(),
+        "generation_flights": quiz_service.generation_flights.stats(),
+        "llm_hedging": quiz_service.hedging_stats(),
+        "gemini_breaker": gemini_breaker.stats(),
+        "gemini_rate_limiter": gemini_rate_limiter.stats(),
+        "gemini_models": model_router.stats(),
+        "jobs": job_manager.stats()
+    }
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,152 @@
+"""
+Routing of quiz requests to Gemini models, with per-model metrics
+
+Routes (GEMINI_MODEL_ROUTES, a JSON list) are tried in order; the first
+route whose conditions all hold picks the model, and the default model
+(GEMINI_MODEL) is used when none does. Conditions:
+
+    min_chars / max_chars          article length in characters
+    min_questions / max_questions  number of questions requested
+    max_p95_ms                     skip the model while its recent p95 latency is higher
+
+Example:
+
+    [{"model": "gemini-2.5-flash-lite", "max_chars": 8000, "max_questions": 5},
+     {"model": "gemini-2.5-pro", "min_questions": 10, "max_p95_ms": 40000}]
+
+Latency, errors and token usage are recorded per model; with prices in
+GEMINI_MODEL_PRICES ({"model": [input, output]} in USD per million tokens)
+the cost is tracked too.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+# Latency percentiles are taken over this many recent requests per model, no
+# older than LATENCY_MAX_AGE_SECONDS (so a model skipped for being slow is
+# tried again later), and latency conditions only apply to MIN_LATENCY_SAMPLES or more
+LATENCY_WINDOW = 200
+LATENCY_MAX_AGE_SECONDS = 300
+MIN_LATENCY_SAMPLES = 20
+
+ROUTE_CONDITIONS = {"min_chars", "max_chars", "min_questions", "max_questions", "max_p95_ms"}
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class ModelStats:
+    """Request, error, latency and token counters of one model."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd = 0.0
+        self._latencies: Deque[tuple] = deque(maxlen=LATENCY_WINDOW)  # (monotonic time, ms)
+
+    def add_latency(self, milliseconds: float):
+        self._latencies.append((time.monotonic(), milliseconds))
+
+    def recent_latencies(self) -> List[float]:
+        cutoff = time.monotonic() - LATENCY_MAX_AGE_SECONDS
+        return [milliseconds for recorded_at, milliseconds in self._latencies if recorded_at >= cutoff]
+
+    def p95_ms(self) -> Optional[float]:
+        latencies = self.recent_latencies()
+        if len(latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        return _percentile(latencies, 0.95)
+
+    def to_dict(self) -> Dict[str, object]:
+        latencies = self.recent_latencies()
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_p50_ms": round(_percentile(latencies, 0.5)) if latencies else None,
+            "latency_p95_ms": round(_percentile(latencies, 0.95)) if latencies else None,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": round(self.cost_usd, 6)
+        }
+
+
+class ModelRouter:
+    """Picks the model for a quiz request and keeps per-model metrics (thread-safe)."""
+
+    def __init__(self, routes: List[Dict], default_model: str, prices: Optional[Dict[str, List[float]]] = None):
+        for route in routes:
+            unknown = set(route) - ROUTE_CONDITIONS - {"model"}
+            if "model" not in route or unknown:
+                raise ValueError(f"Invalid model route {route!r} (allowed keys: model, {', '.join(sorted(ROUTE_CONDITIONS))})")
+        self.routes = routes
+        self.default_model = default_model
+        self.prices = prices or {}
+        self.routed: Dict[str, int] = {}
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def choose(self, content_chars: int, num_questions: int) -> str:
+        """
+        Model for a quiz request.
+
+        Args:
+            content_chars: Length of the article text
+            num_questions: Number of questions requested
+
+        Returns:
+            Model name from the first matching route, else the default model
+        """
+        with self._lock:
+            model = next(
+                (route["model"] for route in self.routes if self._matches(route, content_chars, num_questions)),
+                self.default_model
+            )
+            self.routed[model] = self.routed.get(model, 0) + 1
+        return model
+
+    def _matches(self, route: Dict, content_chars: int, num_questions: int) -> bool:
+        if content_chars < route.get("min_chars", 0) or content_chars > route.get("max_chars", float("inf")):
+            return False
+        if num_questions < route.get("min_questions", 0) or num_questions > route.get("max_questions", float("inf")):
+            return False
+        if "max_p95_ms" in route:
+            p95 = self._stats.get(route["model"], ModelStats()).p95_ms()
+            if p95 is not None and p95 > route["max_p95_ms"]:
+                return False
+        return True
+
+    def record_success(self, model: str, latency_seconds: float, usage=None):
+        """Record a completed request and its usage_metadata (if the SDK returned it)."""
+        input_tokens = getattr(usage, "prompt_token_count", None) or 0
+        output_tokens = getattr(usage, "candidates_token_count", None) or 0
+        with self._lock:
+            stats = self._stats.setdefault(model, ModelStats())
+            stats.requests += 1
+            stats.add_latency(latency_seconds * 1000)
+            stats.input_tokens += input_tokens
+            stats.output_tokens += output_tokens
+            if model in self.prices:
+                input_price, output_price = self.prices[model]
+                stats.cost_usd += (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+    def record_error(self, model: str):
+        with self._lock:
+            stats = self._stats.setdefault(model, ModelStats())
+            stats.requests += 1
+            stats.errors += 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "default_model": self.default_model,
+                "routes": len(self.routes),
+                "routed": dict(self.routed),
+                "models": {model: stats.to_dict() for model, stats in self._stats.items()}
+            }
+
@@ -1,5 +1,5 @@
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from typing import List, Optional
 
 
@@ -30,10 +30,16 @@ class QuizResponse(BaseModel):
     questions: List[QuestionSchema]
     related_topics: Optional[List[str]] = []
     created_at: datetime
+    # This response serialized (see quiz_json.build_quiz_json), when built from a stored quiz
+    _response_json: Optional[bytes] = PrivateAttr(default=None)
 
     class Config:
         from_attributes = True
 
+    @property
+    def response_json(self) -> Optional[bytes]:
+        return self._response_json
+
 
 class QuizSummary(BaseModel):
     id: int
@@ -51,3 +57,67 @@ class QuizGenerationRequest(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str  # queued, running, succeeded, failed
+    wikipedia_url: str
+    num_questions: int
+    result: Optional[QuizResponse] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class BatchQuizItem(BaseModel):
+    wikipedia_url: str
+    num_questions: int = Field(default=5, ge=5, le=10, description="Number of questions (5-10)")
+
+
+class BatchQuizRequest(BaseModel):
+    items: List[BatchQuizItem] = Field(min_length=1, max_length=200, description="Articles to quiz (1-200)")
+
+
+class BatchQuizResult(BaseModel):
+    wikipedia_url: str
+    num_questions: int
+    status_code: int
+    quiz: Optional[QuizResponse] = None
+    error: Optional[str] = None
+
+
+class BatchQuizResponse(BaseModel):
+    results: List[BatchQuizResult]
+    succeeded: int
+    failed: int
+
+
+class QuizOverview(BaseModel):
+    id: int
+    wikipedia_url: str
+    title: str
+    summary: str
+    related_topics: Optional[List[str]] = []
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class QuestionItem(BaseModel):
+    id: int
+    quiz_id: int
+    position: int
+    question: str
+    options: List[str]
+    correct_answer: str
+    explanation: Optional[str] = None
+    difficulty: Optional[str] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,34 @@
+"""
+Hot cache of serialized GET /quiz/{id} responses
+
+The response body for a quiz id (see quiz_json.build_quiz_json) is kept as
+JSON bytes and served without touching the database. The cache is bounded
+by bytes (LRU) and entries expire after a TTL.
+
+Stored quizzes only change when a local quiz is upgraded to Gemini's
+questions (see quiz_service), possibly in another worker, so local quizzes
+are never cached.
+"""
+
+import os
+from typing import Optional
+from dotenv import load_dotenv
+
+from cache import ByteLRUCache
+
+load_dotenv()
+
+QUIZ_CACHE_MAX_BYTES = int(os.getenv("QUIZ_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+QUIZ_CACHE_TTL_SECONDS = float(os.getenv("QUIZ_CACHE_TTL_SECONDS", "3600"))
+
+quiz_response_cache = ByteLRUCache(QUIZ_CACHE_MAX_BYTES, ttl_seconds=QUIZ_CACHE_TTL_SECONDS)
+
+
+def get_quiz_json(quiz_id: int) -> Optional[bytes]:
+    """Serialized QuizResponse for a quiz id, or None on a miss."""
+    return quiz_response_cache.get(quiz_id)
+
+
+def put_quiz_json(quiz_id: int, body: bytes):
+    """Cache the serialized QuizResponse of a quiz."""
+    quiz_response_cache.put(quiz_id, body)
@@ -0,0 +1,65 @@
+"""
+Fast JSON encoding of quiz API responses
+
+Builds the GET /quiz/{id} body straight from the stored quiz data instead of
+validating QuizResponse/QuestionSchema models and encoding them with the
+stdlib. Uses orjson when installed (pip install orjson).
+"""
+
+import json
+from datetime import datetime
+from typing import Dict
+
+# orjson is optional: pip install orjson
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value) -> bytes:
+    """Compact UTF-8 JSON, datetimes as ISO 8601."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def build_quiz_json(quiz_id: int, wikipedia_url: str, title: str, quiz_data: Dict, created_at: datetime) -> bytes:
+    """
+    Encode a quiz in the QuizResponse shape, with the same field order and defaults.
+    
+    Args:
+        quiz_id: Quiz id
+        wikipedia_url: URL the quiz was requested for
+        title: Article title
+        quiz_data: Stored payload with 'summary', 'questions' and 'related_topics'
+        created_at: Quiz creation time
+        
+    Returns:
+        JSON bytes equal to QuizResponse(...).model_dump_json()
+    """
+    return dumps({
+        "id": quiz_id,
+        "wikipedia_url": wikipedia_url,
+        "title": title,
+        "summary": quiz_data.get("summary", ""),
+        "questions": [
+            {
+                "question": question["question"],
+                "options": question["options"],
+                "correct_answer": question["correct_answer"],
+                "explanation": question.get("explanation"),
+                "difficulty": question.get("difficulty", "medium")
+            }
+            for question in quiz_data.get("questions", [])
+        ],
+        "related_topics": quiz_data.get("related_topics", []),
+        "created_at": created_at
+    })
@@ -0,0 +1,721 @@
+"""
+Quiz generation pipeline shared by the API endpoints
+Reuses stored quizzes, scrapes the article, calls the quiz generator and
+stores the result. Each run opens its own database session so the work can
+be shared between requests (see SingleFlight) or run outside a request.
+
+When Gemini has not answered within QUIZ_LLM_DEADLINE_SECONDS, a quiz from
+the local generator is stored and returned instead, and (with
+QUIZ_UPGRADE_LOCAL_QUIZZES) replaced by Gemini's once that arrives.
+"""
+
+import asyncio
+import math
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+from fastapi import HTTPException
+from sqlalchemy import inspect, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, undefer, undefer_group
+from sqlalchemy.exc import IntegrityError
+from dotenv import load_dotenv
+
+from database import AsyncSessionLocal, Quiz, Question
+from models import QuizResponse, QuestionSchema
+from scraper import scrape_wikipedia_async, canonicalize_wikipedia_url, validate_wikipedia_url, truncate_content
+from llm_quiz_generator import generate_quiz_async, generate_quiz_streaming_async, GEMINI_MODEL, gemini_breaker
+from local_quiz_generator import generate_local_quiz, LOCAL_GENERATOR
+from singleflight import SingleFlight
+from rate_limiter import gemini_priority, RateLimitExceeded, BACKGROUND
+import quiz_cache
+from quiz_json import build_quiz_json
+
+load_dotenv()
+
+# Stored quizzes are re-checked against the live article at most this often
+QUIZ_REVALIDATE_SECONDS = int(os.getenv("QUIZ_REVALIDATE_SECONDS", "600"))
+
+# Articles scraped and generated at the same time by one batch request
+QUIZ_BATCH_CONCURRENCY = int(os.getenv("QUIZ_BATCH_CONCURRENCY", "8"))
+
+# Seconds to wait for Gemini before serving a locally generated quiz (0 = always wait)
+QUIZ_LLM_DEADLINE_SECONDS = float(os.getenv("QUIZ_LLM_DEADLINE_SECONDS", "0"))
+# Replace such local quizzes with Gemini's once it answers
+QUIZ_UPGRADE_LOCAL_QUIZZES = os.getenv("QUIZ_UPGRADE_LOCAL_QUIZZES", "true").lower() == "true"
+# Upgrades not finished this long after they started are assumed lost (e.g. the worker restarted)
+QUIZ_UPGRADE_MAX_SECONDS = 300
+
+# Concurrent requests for the same article and question count share one run
+generation_flights = SingleFlight()
+
+# Gemini calls still running for quizzes served from the local generator
+_upgrade_tasks: Dict[int, asyncio.Task] = {}  # Quiz id -> upgrade task
+_hedging_counts = {"hedged": 0, "upgraded": 0, "upgrade_failed": 0}
+
+
+def rate_limited_error(error: RateLimitExceeded) -> HTTPException:
+    """429 response for a request refused by the Gemini rate limiter."""
+    return HTTPException(
+        status_code=429,
+        detail="Too many quiz generation requests, try again later",
+        headers={"Retry-After": str(max(math.ceil(error.retry_after), 1))}
+    )
+
+
+def quiz_to_response(quiz: Quiz) -> QuizResponse:
+    """
+    Build the API response for a stored quiz row.
+    The models are built without validation: endpoints serve the quiz's
+    response_json (carried on the response) instead, which is made from the
+    same payload.
+    """
+    quiz_data = quiz.full_quiz_data
+    response = QuizResponse.model_construct(
+        id=quiz.id,
+        wikipedia_url=quiz.url,
+        title=quiz.title,
+        summary=quiz_data.get("summary", ""),
+        questions=[QuestionSchema.model_construct(**q) for q in quiz_data.get("questions", [])],
+        related_topics=quiz_data.get("related_topics", []),
+        created_at=quiz.date_generated
+    )
+    # Rows loaded without the deferred column, or stored before it existed, are encoded here
+    body = None if "response_json" in inspect(quiz).unloaded else quiz.response_json
+    response._response_json = body or build_quiz_json(
+        quiz.id, quiz.url, quiz.title, quiz_data, quiz.date_generated
+    )
+    return response
+
+
+async def find_reusable_quiz(db: AsyncSession, canonical_url: str, num_questions: int):
+    """Return the stored quiz for this article and question count, if any."""
+    result = await db.execute(
+        select(Quiz).options(undefer(Quiz.response_json)).where(
+            Quiz.canonical_url == canonical_url,
+            Quiz.num_questions == num_questions
+        )
+    )
+    return result.scalars().first()
+
+
+def is_stand_in(quiz: Quiz) -> bool:
+    """
+    Whether a stored quiz came from the local generator (Gemini failed, was
+    too slow or the circuit breaker was open) and no worker is upgrading it.
+    Such quizzes are regenerated on the next request instead of reused.
+    """
+    if quiz.generated_by != LOCAL_GENERATOR:
+        return False
+    if quiz.upgrade_started_at is None:
+        return True
+    return (datetime.now() - quiz.upgrade_started_at).total_seconds() >= QUIZ_UPGRADE_MAX_SECONDS
+
+
+def needs_revalidation(quiz: Quiz) -> bool:
+    """Whether the article behind a stored quiz should be checked for changes."""
+    if quiz.validated_at is None:
+        return True
+    return (datetime.now() - quiz.validated_at).total_seconds() >= QUIZ_REVALIDATE_SECONDS
+
+
+def quiz_validators(quiz: Quiz) -> dict:
+    """Validators of the article version a quiz was generated from."""
+    return {
+        "revision_id": quiz.revision_id,
+        "etag": quiz.etag,
+        "last_modified": quiz.last_modified
+    }
+
+
+def article_unchanged(quiz: Quiz, article_data: dict) -> bool:
+    """Compare a freshly scraped article with the version a quiz was built from."""
+    if quiz.revision_id is None:
+        # Quizzes stored before revisions were tracked adopt the current version
+        return True
+    return article_data.get("revision_id") == quiz.revision_id
+
+
+def record_article_version(quiz: Quiz, article_data: dict):
+    """Store the scraped article's validators on a quiz and mark it fresh."""
+    quiz.revision_id = article_data.get("revision_id") or quiz.revision_id
+    quiz.etag = article_data.get("etag")
+    quiz.last_modified = article_data.get("last_modified")
+    quiz.validated_at = datetime.now()
+
+
+async def get_or_create_quiz(wikipedia_url: str, num_questions: int) -> QuizResponse:
+    """
+    Return a quiz for the article, generating it only when needed.
+    Concurrent calls for the same canonical URL and question count share
+    a single scrape + generation and all receive the same stored quiz.
+    
+    Args:
+        wikipedia_url: Validated Wikipedia article URL
+        num_questions: Number of questions (5-10)
+        
+    Returns:
+        QuizResponse for the stored quiz
+        
+    Raises:
+        HTTPException: 400 if the article cannot be scraped, 500 if generation fails
+    """
+    canonical_url = canonicalize_wikipedia_url(wikipedia_url)
+    return await generation_flights.do(
+        (canonical_url, num_questions),
+        lambda: _generate_or_reuse(wikipedia_url, canonical_url, num_questions)
+    )
+
+
+async def generate_quiz_batch(items: List[Tuple[str, int]]) -> List[Union[QuizResponse, HTTPException]]:
+    """
+    Return quizzes for many articles at once.
+    Identical articles (same canonical URL and question count) are handled
+    once, and share the work of concurrent requests for the same quiz; at
+    most QUIZ_BATCH_CONCURRENCY articles are scraped and generated
+    concurrently, and all new quizzes are inserted in one transaction.
+    
+    Args:
+        items: (wikipedia_url, num_questions) pairs
+        
+    Returns:
+        Per item, in order: the QuizResponse or the HTTPException explaining the failure
+    """
+    results: List[Union[QuizResponse, HTTPException, None]] = [None] * len(items)
+    unique: Dict[Tuple[str, int], List[int]] = {}
+    first_url: Dict[Tuple[str, int], str] = {}
+    for index, (wikipedia_url, num_questions) in enumerate(items):
+        if not validate_wikipedia_url(wikipedia_url):
+            results[index] = HTTPException(
+                status_code=400,
+                detail="Invalid Wikipedia URL. Must be a valid Wikipedia article URL."
+            )
+            continue
+        key = (canonicalize_wikipedia_url(wikipedia_url), num_questions)
+        unique.setdefault(key, []).append(index)
+        first_url.setdefault(key, wikipedia_url)
+
+    semaphore = asyncio.Semaphore(QUIZ_BATCH_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+    # Quizzes this batch generated, and the futures their flights wait on
+    # until the batch stores them all in one transaction
+    pending: Dict[Tuple[str, int], PendingQuiz] = {}
+    stored: Dict[Tuple[str, int], asyncio.Future] = {}
+    prepared = {key: asyncio.Event() for key in unique}
+
+    async def prepare_and_store(key):
+        try:
+            async with semaphore:
+                outcome = await _prepare_quiz(first_url[key], key[0], key[1])
+            if isinstance(outcome, QuizResponse):
+                return outcome
+            pending[key] = outcome
+            stored[key] = loop.create_future()
+        finally:
+            prepared[key].set()
+        return await stored[key]
+
+    async def until_prepared(key, flight):
+        # A flight another request started finishes on its own
+        waiter = asyncio.ensure_future(prepared[key].wait())
+        await asyncio.wait([flight, waiter], return_when=asyncio.FIRST_COMPLETED)
+        waiter.cancel()
+
+    keys = list(unique)
+    # Batch work yields Gemini capacity to interactive requests
+    with gemini_priority(BACKGROUND):
+        # Sharing the flights coalesces items with concurrent requests for the same quiz
+        flights = [
+            asyncio.ensure_future(generation_flights.do(key, lambda key=key: prepare_and_store(key)))
+            for key in keys
+        ]
+    try:
+        await asyncio.gather(*[until_prepared(key, flight) for key, flight in zip(keys, flights)])
+        if pending:
+            pending_keys = list(pending)
+            try:
+                async with AsyncSessionLocal() as db:
+                    stored_quizzes = await _store_quizzes(db, [pending[key] for key in pending_keys])
+            except Exception as e:
+                stored_quizzes = [e] * len(pending_keys)
+            for key, outcome in zip(pending_keys, stored_quizzes):
+                if isinstance(outcome, Exception):
+                    stored[key].set_exception(outcome)
+                else:
+                    stored[key].set_result(outcome)
+        finished = await asyncio.gather(*flights, return_exceptions=True)
+    finally:
+        for future in stored.values():
+            if not future.done():
+                future.set_exception(HTTPException(
+                    status_code=503, detail="Batch was cancelled before the quiz was stored"
+                ))
+
+    outcomes = {}
+    for key, outcome in zip(keys, finished):
+        if isinstance(outcome, Exception) and not isinstance(outcome, HTTPException):
+            outcome = HTTPException(status_code=500, detail=f"Internal server error: {str(outcome)}")
+        outcomes[key] = outcome
+
+    for key, indexes in unique.items():
+        for index in indexes:
+            results[index] = outcomes[key]
+    return results
+
+
+async def stream_quiz_events(wikipedia_url: str, num_questions: int):
+    """
+    Like get_or_create_quiz, but yields the quiz while it is being generated.
+    Yields ("summary", text) and ("question", dict) as Gemini completes them,
+    then ("quiz", QuizResponse) once the quiz is stored. When the quiz is
+    reused or another request is already generating it, the summary and
+    questions are yielded from the final result instead. If the stored quiz
+    is not the one that was streamed (e.g. Gemini failed partway and the
+    fallback quiz was used), ("reset", None) is yielded and the stored
+    quiz's summary and questions follow.
+    
+    Args:
+        wikipedia_url: Validated Wikipedia article URL
+        num_questions: Number of questions (5-10)
+        
+    Yields:
+        (event name, data) tuples
+        
+    Raises:
+        HTTPException: 400 if the article cannot be scraped, 500 if generation fails
+    """
+    canonical_url = canonicalize_wikipedia_url(wikipedia_url)
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def generate_streaming(content, title, num_questions):
+        return await generate_quiz_streaming_async(
+            content, title, num_questions,
+            on_event=lambda kind, data: events.put_nowait((kind, data))
+        )
+
+    flight = asyncio.ensure_future(generation_flights.do(
+        (canonical_url, num_questions),
+        # Questions are streamed as Gemini writes them, so there is no deadline to hedge
+        lambda: _generate_or_reuse(wikipedia_url, canonical_url, num_questions, generate_streaming, deadline=0)
+    ))
+    streamed_summary: Optional[str] = None
+    streamed_questions: List[str] = []
+    next_event: Optional[asyncio.Future] = None
+    try:
+        while True:
+            next_event = asyncio.ensure_future(events.get())
+            await asyncio.wait([next_event, flight], return_when=asyncio.FIRST_COMPLETED)
+            if not next_event.done():
+                next_event.cancel()
+                break
+            kind, data = next_event.result()
+            if kind == "summary":
+                streamed_summary = data
+            else:
+                streamed_questions.append(data.get("question"))
+            yield kind, data
+
+        # Events queued in the same loop iteration the flight finished
+        while not events.empty():
+            kind, data = events.get_nowait()
+            if kind == "summary":
+                streamed_summary = data
+            else:
+                streamed_questions.append(data.get("question"))
+            yield kind, data
+
+        quiz = flight.result()
+        stored_questions = [question.question for question in quiz.questions]
+        if (streamed_summary not in (None, quiz.summary)
+                or stored_questions[:len(streamed_questions)] != streamed_questions):
+            # What was streamed is not the stored quiz; the client starts over
+            yield "reset", None
+            streamed_summary, streamed_questions = None, []
+        if streamed_summary is None:
+            yield "summary", quiz.summary
+        for question in quiz.questions[len(streamed_questions):]:
+            yield "question", question.model_dump()
+        yield "quiz", quiz
+    finally:
+        # The client may disconnect while a question is awaited
+        if next_event is not None and not next_event.done():
+            next_event.cancel()
+        if not flight.done():
+            # The shared generation keeps running for other callers
+            flight.cancel()
+
+
+async def _generate_or_reuse(wikipedia_url: str, canonical_url: str, num_questions: int,
+                             generate=generate_quiz_async, deadline: Optional[float] = None) -> QuizResponse:
+    prepared = await _prepare_quiz(wikipedia_url, canonical_url, num_questions, generate, deadline)
+    if isinstance(prepared, QuizResponse):
+        return prepared
+
+    async with AsyncSessionLocal() as db:
+        result = (await _store_quizzes(db, [prepared]))[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+class PendingQuiz:
+    """A generated quiz that still has to be stored."""
+
+    def __init__(self, quiz: Quiz, quiz_data: dict, replaces_id: Optional[int] = None):
+        self.quiz = quiz
+        self.quiz_data = quiz_data
+        # Stored quiz for an older revision of the article, detached on insert
+        self.replaces_id = replaces_id
+        # Gemini call still running when a local quiz was served instead
+        self.upgrade: Optional[asyncio.Future] = None
+
+
+async def _prepare_quiz(wikipedia_url: str, canonical_url: str, num_questions: int,
+                        generate=generate_quiz_async,
+                        deadline: Optional[float] = None) -> Union[QuizResponse, PendingQuiz]:
+    """
+    Reuse/revalidate a stored quiz, or scrape and generate a new one (not stored yet).
+    deadline overrides QUIZ_LLM_DEADLINE_SECONDS (0 never serves a local quiz).
+    """
+    # Reuse an existing quiz for the same article. The session is closed before
+    # scraping so slow Wikipedia requests don't hold pooled connections.
+    async with AsyncSessionLocal() as db:
+        existing_quiz = await find_reusable_quiz(db, canonical_url, num_questions)
+    stand_in = None
+    if existing_quiz and is_stand_in(existing_quiz):
+        if gemini_breaker.is_open():
+            # Regenerating would only produce another local quiz
+            return quiz_to_response(existing_quiz)
+        stand_in, existing_quiz = existing_quiz, None
+    if existing_quiz and not needs_revalidation(existing_quiz):
+        return quiz_to_response(existing_quiz)
+
+    # Scrape Wikipedia article (conditionally when a quiz already exists)
+    try:
+        article_data = await scrape_wikipedia_async(
+            wikipedia_url,
+            quiz_validators(existing_quiz) if existing_quiz else None
+        )
+    except Exception as e:
+        if existing_quiz or stand_in:
+            # Serve the stored quiz rather than failing on a revalidation error
+            return quiz_to_response(existing_quiz or stand_in)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to scrape Wikipedia article: {str(e)}"
+        )
+
+    if existing_quiz:
+        if article_data is None or article_unchanged(existing_quiz, article_data):
+            if article_data is None:
+                existing_quiz.validated_at = datetime.now()
+            else:
+                record_article_version(existing_quiz, article_data)
+            async with AsyncSessionLocal() as db:
+                db.add(existing_quiz)
+                await db.commit()
+            return quiz_to_response(existing_quiz)
+
+    # Generate quiz using AI (the generator picks the prompt context from the full article)
+    try:
+        quiz_data, upgrade = await _generate_within_deadline(
+            generate,
+            article_data.get("full_content") or article_data["content"],
+            article_data["title"],
+            num_questions,
+            QUIZ_LLM_DEADLINE_SECONDS if deadline is None else deadline
+        )
+    except RateLimitExceeded as e:
+        raise rate_limited_error(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate quiz: {str(e)}"
+        )
+
+    if stand_in and quiz_data.get("generated_by") == LOCAL_GENERATOR and upgrade is None:
+        # Gemini failed again; keep the stored stand-in rather than adding another
+        return quiz_to_response(stand_in)
+
+    # The article changed (or the stored quiz was a stand-in): the old quiz
+    # stays in history but is no longer reused
+    pending = _new_pending_quiz(
+        wikipedia_url, canonical_url, num_questions, article_data, quiz_data,
+        (existing_quiz or stand_in).id if existing_quiz or stand_in else None
+    )
+    pending.upgrade = upgrade
+    if upgrade is not None and QUIZ_UPGRADE_LOCAL_QUIZZES:
+        # Tells every worker that Gemini's questions are on the way
+        pending.quiz.upgrade_started_at = datetime.now()
+    return pending
+
+
+async def _generate_within_deadline(generate, content: str, title: str, num_questions: int,
+                                    deadline: float) -> Tuple[dict, Optional[asyncio.Future]]:
+    """
+    Run the quiz generator, falling back to the local generator if it is too slow.
+    
+    Args:
+        generate: Quiz generator coroutine function
+        content: Article text
+        title: Article title
+        num_questions: Number of questions
+        deadline: Seconds to wait for the generator, 0 to wait for it however long it takes
+        
+    Returns:
+        The quiz data, and the still running generation when a local quiz was
+        returned in its place (None otherwise)
+    """
+    generation = asyncio.ensure_future(
+        generate(content=content, title=title, num_questions=num_questions)
+    )
+    if deadline <= 0:
+        return await generation, None
+
+    try:
+        done, _ = await asyncio.wait([generation], timeout=deadline)
+        if done:
+            return generation.result(), None
+        local_quiz = await asyncio.to_thread(generate_local_quiz, content, title, num_questions)
+        if local_quiz is None:
+            # Nothing better to serve quickly; keep waiting for Gemini
+            return await generation, None
+    except asyncio.CancelledError:
+        generation.cancel()
+        raise
+
+    _hedging_counts["hedged"] += 1
+    print(f"⏱️ Gemini missed the {deadline:g}s deadline for '{title}', serving a local quiz")
+    return {**local_quiz, "generated_by": LOCAL_GENERATOR}, generation
+
+
+def _new_pending_quiz(wikipedia_url: str, canonical_url: str, num_questions: int, article_data: dict,
+                      quiz_data: dict, replaces_id: Optional[int]) -> PendingQuiz:
+    """Quiz row (with its question rows and compressed article) for a generated quiz."""
+    quiz_db = Quiz(
+        url=wikipedia_url,
+        canonical_url=canonical_url,
+        num_questions=num_questions,
+        title=article_data["title"],
+        scraped_content=article_data["content"][:1000],
+        full_quiz_data={
+            "summary": quiz_data["summary"],
+            "questions": quiz_data["questions"],
+            "related_topics": quiz_data.get("related_topics", [])
+        },
+        generated_by=quiz_data.get("generated_by", GEMINI_MODEL)
+    )
+    quiz_db.questions = [
+        Question.from_quiz_data(position, question)
+        for position, question in enumerate(quiz_data["questions"])
+    ]
+    # Kept so the quiz can be regenerated later without re-scraping
+    quiz_db.article_text = article_data.get("full_content") or article_data["content"]
+    record_article_version(quiz_db, article_data)
+    return PendingQuiz(quiz_db, quiz_data, replaces_id)
+
+
+async def regenerate_quiz(quiz_id: int, num_questions: Optional[int] = None) -> QuizResponse:
+    """
+    Generate a new quiz from the article stored with an existing quiz, without scraping.
+    The new quiz becomes the reusable quiz for its article and question count;
+    earlier quizzes stay in history.
+    
+    Args:
+        quiz_id: Quiz whose stored article is used
+        num_questions: Number of questions (defaults to the original quiz's)
+        
+    Returns:
+        QuizResponse for the new quiz
+        
+    Raises:
+        HTTPException: 404 if the quiz does not exist, 409 if it has no stored
+            article, 500 if generation fails, 503 if Gemini is unavailable
+    """
+    async with AsyncSessionLocal() as db:
+        quiz = await db.get(Quiz, quiz_id, options=[undefer_group("article")])
+        if quiz is None:
+            raise HTTPException(status_code=404, detail=f"Quiz with ID {quiz_id} not found")
+        article_text = quiz.article_text
+        if article_text is None:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Quiz {quiz_id} was stored without its article and must be re-scraped"
+            )
+
+        num_questions = num_questions or quiz.num_questions or len(quiz.full_quiz_data.get("questions", []))
+        canonical_url = quiz.canonical_url or canonicalize_wikipedia_url(quiz.url)
+        current_quiz = await find_reusable_quiz(db, canonical_url, num_questions)
+        article_data = {
+            "title": quiz.title,
+            "content": truncate_content(article_text),
+            "full_content": article_text,
+            "revision_id": quiz.revision_id,
+            "etag": quiz.etag,
+            "last_modified": quiz.last_modified
+        }
+        wikipedia_url, validated_at = quiz.url, quiz.validated_at
+
+    try:
+        quiz_data = await generate_quiz_async(
+            content=article_text,
+            title=article_data["title"],
+            num_questions=num_questions
+        )
+    except RateLimitExceeded as e:
+        raise rate_limited_error(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate quiz: {str(e)}"
+        )
+    if quiz_data.get("generated_by") == LOCAL_GENERATOR:
+        # Gemini failed; a local quiz must not replace the current one
+        raise HTTPException(
+            status_code=503,
+            detail="Gemini is unavailable, quiz was not regenerated"
+        )
+
+    pending = _new_pending_quiz(
+        wikipedia_url, canonical_url, num_questions, article_data, quiz_data,
+        current_quiz.id if current_quiz else None
+    )
+    # The article was not re-checked, so it is exactly as fresh as the source quiz
+    pending.quiz.validated_at = validated_at
+
+    async with AsyncSessionLocal() as db:
+        result = (await _store_quizzes(db, [pending]))[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+async def _store_quizzes(db: AsyncSession, pending_quizzes: List[PendingQuiz]) -> List[Union[QuizResponse, Exception]]:
+    """
+    Insert generated quizzes in a single transaction.
+    Each insert runs in a savepoint, so a quiz that another request stored
+    first only resolves to that quiz instead of failing the whole batch.
+    
+    Args:
+        db: Async database session
+        pending_quizzes: Quizzes returned by _prepare_quiz
+        
+    Returns:
+        One QuizResponse (or the exception for that item) per pending quiz
+    """
+    results: List[Union[QuizResponse, Exception, None]] = []
+    for pending in pending_quizzes:
+        quiz_db = pending.quiz
+        try:
+            async with db.begin_nested():
+                if pending.replaces_id is not None:
+                    await db.execute(
+                        update(Quiz).where(Quiz.id == pending.replaces_id).values(canonical_url=None)
+                    )
+                db.add(quiz_db)
+                await db.flush()
+                quiz_db.response_json = build_quiz_json(
+                    quiz_db.id, quiz_db.url, quiz_db.title, quiz_db.full_quiz_data, quiz_db.date_generated
+                )
+            results.append(None)
+        except IntegrityError:
+            # Another request or worker process stored the same article first; serve its quiz
+            existing_quiz = await find_reusable_quiz(db, quiz_db.canonical_url, quiz_db.num_questions)
+            if existing_quiz:
+                results.append(quiz_to_response(existing_quiz))
+            else:
+                results.append(HTTPException(status_code=500, detail="Failed to store quiz"))
+    await db.commit()
+
+    responses = []
+    for pending, result in zip(pending_quizzes, results):
+        if pending.upgrade is not None:
+            if result is None and QUIZ_UPGRADE_LOCAL_QUIZZES:
+                _schedule_upgrade(pending.quiz.id, pending.upgrade)
+            else:
+                pending.upgrade.cancel()
+        if result is None:
+            quiz_db = pending.quiz
+            result = quiz_to_response(quiz_db)
+            # New quizzes are usually read right after they are shared
+            if quiz_db.generated_by != LOCAL_GENERATOR:
+                quiz_cache.put_quiz_json(quiz_db.id, quiz_db.response_json)
+        responses.append(result)
+    return responses
+
+
+def _schedule_upgrade(quiz_id: int, generation: asyncio.Future):
+    task = asyncio.ensure_future(_upgrade_local_quiz(quiz_id, generation))
+    _upgrade_tasks[quiz_id] = task
+    task.add_done_callback(lambda done: _upgrade_tasks.pop(quiz_id, None))
+
+
+async def _upgrade_local_quiz(quiz_id: int, generation: asyncio.Future):
+    """
+    Replace the questions of a quiz served from the local generator with
+    Gemini's once the Gemini call finishes. The quiz keeps its id, so later
+    reads of it (and reuses of the article) get the better quiz.
+    
+    Args:
+        quiz_id: Stored quiz with generated_by == LOCAL_GENERATOR
+        generation: The Gemini call that missed the deadline
+    """
+    try:
+        quiz_data = await generation
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        _hedging_counts["upgrade_failed"] += 1
+        print(f"⚠️ Quiz {quiz_id} keeps its local questions: {str(e)}")
+        await _end_upgrade(quiz_id)
+        return
+    if quiz_data.get("generated_by") == LOCAL_GENERATOR:
+        # Gemini failed and the generator fell back to the local quiz itself
+        _hedging_counts["upgrade_failed"] += 1
+        await _end_upgrade(quiz_id)
+        return
+
+    async with AsyncSessionLocal() as db:
+        quiz = await db.get(Quiz, quiz_id, options=[selectinload(Quiz.questions)])
+        if quiz is None or quiz.generated_by != LOCAL_GENERATOR:
+            return
+        quiz.full_quiz_data = {
+            "summary": quiz_data["summary"],
+            "questions": quiz_data["questions"],
+            "related_topics": quiz_data.get("related_topics", [])
+        }
+        quiz.generated_by = quiz_data.get("generated_by", GEMINI_MODEL)
+        quiz.upgrade_started_at = None
+        quiz.questions = [
+            Question.from_quiz_data(position, question)
+            for position, question in enumerate(quiz_data["questions"])
+        ]
+        quiz.response_json = build_quiz_json(
+            quiz.id, quiz.url, quiz.title, quiz.full_quiz_data, quiz.date_generated
+        )
+        await db.commit()
+        response_json = quiz.response_json
+
+    quiz_cache.put_quiz_json(quiz_id, response_json)
+    _hedging_counts["upgraded"] += 1
+    print(f"✅ Quiz {quiz_id} upgraded to Gemini's questions")
+
+
+async def _end_upgrade(quiz_id: int):
+    """Clear a failed upgrade's marker so the local quiz is regenerated on its next request."""
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Quiz).where(Quiz.id == quiz_id).values(upgrade_started_at=None))
+        await db.commit()
+
+
+async def stop_upgrades():
+    """Cancel quiz upgrades still waiting for Gemini (the local quizzes stay)."""
+    tasks = list(_upgrade_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def hedging_stats() -> Dict[str, int]:
+    """Local quizzes served on a missed deadline and what became of their upgrades."""
+    return {**_hedging_counts, "upgrades_pending": len(_upgrade_tasks)}
@@ -0,0 +1,201 @@
+"""
+Process-wide rate limiting of Gemini requests
+
+Two token buckets (requests per minute and tokens per minute) sit in front
+of every Gemini call. Callers that cannot go yet wait in a priority queue, so
+interactive requests are served before background jobs and batch work, in
+arrival order within a priority. A caller whose estimated wait exceeds its
+limit is refused with RateLimitExceeded (answered as 429 + Retry-After)
+instead of queueing, and so is one still waiting when its limit is reached.
+The priority of the current work is carried in a context variable (see
+gemini_priority), so it follows the request through the pipeline.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Gemini quota to stay within (0 = unlimited)
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "0"))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "0"))
+# Longest queue wait before answering 429, per priority
+GEMINI_QUEUE_MAX_WAIT_SECONDS = float(os.getenv("GEMINI_QUEUE_MAX_WAIT_SECONDS", "10"))
+GEMINI_BACKGROUND_QUEUE_MAX_WAIT_SECONDS = float(os.getenv("GEMINI_BACKGROUND_QUEUE_MAX_WAIT_SECONDS", "300"))
+
+# Lower values are served first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+request_priority: ContextVar[int] = ContextVar("gemini_request_priority", default=INTERACTIVE)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request would wait longer than allowed for Gemini capacity."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Gemini rate limit reached, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+@contextmanager
+def gemini_priority(priority: int):
+    """Run the enclosed work (and tasks it creates) at the given priority."""
+    token = request_priority.set(priority)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+class TokenBucket:
+    """Bucket refilled continuously at `per_minute`, holding at most one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self._updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def seconds_until(self, amount: float) -> float:
+        """Time until `amount` is available."""
+        return max(amount - self.level, 0.0) / self.rate
+
+
+class GeminiRateLimiter:
+    """
+    Token buckets for requests and tokens with a priority queue of waiters.
+
+    Only the first waiter in priority order may take capacity, so a large
+    request is not starved by smaller ones behind it. Usage is debited when
+    a request starts from the caller's estimate and corrected with
+    record_usage() once the real token count is known.
+    """
+
+    def __init__(self, requests_per_minute: int = GEMINI_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = GEMINI_TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.granted = 0
+        self.queued = 0
+        self.rejected = 0
+        self._waiters: List[list] = []  # [priority, sequence, tokens, future]
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    async def acquire(self, tokens: int, priority: Optional[int] = None, max_wait: Optional[float] = None):
+        """
+        Wait until a request using about `tokens` tokens may be sent.
+
+        Args:
+            tokens: Estimated prompt + output tokens of the request
+            priority: INTERACTIVE or BACKGROUND (default: the current gemini_priority)
+            max_wait: Longest acceptable wait (default per priority)
+
+        Raises:
+            RateLimitExceeded: If the wait is estimated to be, or turns out, longer than max_wait
+        """
+        if not self.enabled:
+            return
+        priority = request_priority.get() if priority is None else priority
+        if max_wait is None:
+            max_wait = GEMINI_QUEUE_MAX_WAIT_SECONDS if priority <= INTERACTIVE else GEMINI_BACKGROUND_QUEUE_MAX_WAIT_SECONDS
+
+        self._refill()
+        estimate = self._estimated_wait(tokens, priority)
+        if estimate > max_wait:
+            self.rejected += 1
+            raise RateLimitExceeded(estimate)
+
+        waiter = [priority, next(self._sequence), tokens, asyncio.get_running_loop().create_future()]
+        heapq.heappush(self._waiters, waiter)
+        self._dispatch()
+        if not waiter[3].done():
+            self.queued += 1
+        try:
+            await asyncio.wait_for(waiter[3], max_wait)
+        except asyncio.TimeoutError:
+            # Overtaken by higher-priority work; the cancelled waiter is skipped by _dispatch
+            self.rejected += 1
+            self._dispatch()
+            raise RateLimitExceeded(self._estimated_wait(tokens, priority))
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Correct the token bucket once a request's real token count is known."""
+        if self.tokens is not None and actual_tokens:
+            self._refill()
+            self.tokens.level -= actual_tokens - estimated_tokens
+
+    def stats(self) -> Dict[str, object]:
+        self._refill()
+        return {
+            "enabled": self.enabled,
+            "granted": self.granted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "waiting": sum(1 for waiter in self._waiters if not waiter[3].done()),
+            "requests_available": int(self.requests.level) if self.requests else None,
+            "tokens_available": int(self.tokens.level) if self.tokens else None
+        }
+
+    def _refill(self):
+        now = time.monotonic()
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.refill(now)
+
+    def _seconds_until(self, requests: float, tokens: float) -> float:
+        """Time until both buckets hold the given amounts."""
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.seconds_until(requests))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.seconds_until(tokens))
+        return wait
+
+    def _estimated_wait(self, tokens: int, priority: int) -> float:
+        """Time until the waiters served before this request, and the request itself, fit."""
+        ahead = [waiter for waiter in self._waiters if not waiter[3].done() and waiter[0] <= priority]
+        return self._seconds_until(len(ahead) + 1, sum(waiter[2] for waiter in ahead) + tokens)
+
+    def _dispatch(self):
+        """Grant capacity to waiters in priority order, then sleep until the next one fits."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._refill()
+        while self._waiters:
+            priority, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            # A request larger than a minute's tokens goes once the bucket is full
+            wait = self._seconds_until(1, min(tokens, self.tokens.capacity) if self.tokens else 0)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            if self.requests is not None:
+                self.requests.level -= 1
+            if self.tokens is not None:
+                self.tokens.level -= tokens
+            self.granted += 1
+            future.set_result(None)
+
+
+gemini_rate_limiter = GeminiRateLimiter()
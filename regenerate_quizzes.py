@@ -0,0 +1,41 @@
+"""
+Regenerate quizzes offline from their stored articles (no Wikipedia requests)
+
+Usage: python regenerate_quizzes.py QUIZ_ID [QUIZ_ID ...] [--num-questions N]
+
+Each new quiz becomes the one reused for its article; the old ones stay in
+history. Quizzes stored before full articles were kept cannot be regenerated.
+Note that identical inputs are answered from the Gemini result cache, so
+regenerating with the same prompt version and question count returns the
+same questions.
+"""
+
+import argparse
+import asyncio
+
+from database import async_engine, init_db
+from quiz_service import regenerate_quiz
+
+
+async def regenerate_all(quiz_ids, num_questions=None):
+    """Regenerate each quiz in turn, reporting successes and failures."""
+    try:
+        for quiz_id in quiz_ids:
+            try:
+                quiz = await regenerate_quiz(quiz_id, num_questions)
+                print(f"✅ Quiz {quiz_id} -> new quiz {quiz.id}: {quiz.title} ({len(quiz.questions)} questions)")
+            except Exception as e:
+                print(f"❌ Quiz {quiz_id}: {getattr(e, 'detail', e)}")
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenerate quizzes from their stored articles")
+    parser.add_argument("quiz_ids", nargs="+", type=int, help="Ids of the quizzes to regenerate")
+    parser.add_argument("--num-questions", type=int, choices=range(5, 11), metavar="5-10",
+                        help="Number of questions (default: same as the original quiz)")
+    args = parser.parse_args()
+
+    init_db()
+    asyncio.run(regenerate_all(args.quiz_ids, args.num_questions))
@@ -0,0 +1,56 @@
+"""
+In-process request coalescing ("single-flight") for async work
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Run at most one coroutine per key at a time.
+
+    Callers that arrive while work for their key is in flight wait for that
+    work and receive its result (or exception) instead of starting their own.
+    The work runs as its own task, so a caller that disconnects or is
+    cancelled does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await `work()` for `key`, sharing an in-flight run when there is one.
+
+        Args:
+            key: Identity of the work, e.g. (canonical_url, num_questions)
+            work: Zero-argument coroutine function doing the work
+
+        Returns:
+            The result of the (possibly shared) run
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(work())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._inflight), "started": self.started, "coalesced": self.coalesced}
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark a failure as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
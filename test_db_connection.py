@@ -67,7 +67,7 @@ def test_crud_operations():
             url="https://en.wikipedia.org/wiki/Python_(programming_language)",
             title="Python Programming Language Quiz",
             scraped_content="Python is a high-level programming language...",
-            full_quiz_data='{"questions": [{"question": "What is Python?", "answer": "A programming language"}]}'
+            full_quiz_data={"questions": [{"question": "What is Python?", "answer": "A programming language"}]}
         )
         
         db.add(test_quiz)
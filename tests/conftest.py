@@ -0,0 +1,11 @@
+"""
+Unit tests for the backend modules (run with `python -m pytest tests`)
+
+The test_*.py scripts in the project root exercise a running server; the
+tests here need neither the server, Gemini nor Wikipedia.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
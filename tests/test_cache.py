@@ -0,0 +1,89 @@
+"""Tests for the byte-bounded LRU cache and the LLM cache key."""
+
+import time
+
+from cache import ByteLRUCache
+from llm_cache import make_cache_key
+
+
+def test_get_returns_stored_value():
+    cache = ByteLRUCache(max_bytes=100)
+    cache.put("a", b"alpha")
+
+    assert cache.get("a") == b"alpha"
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = ByteLRUCache(max_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa"
+    assert cache.get("c") == b"cccc"
+    assert cache.stats()["bytes"] == 8
+    assert cache.stats()["evictions"] == 1
+
+
+def test_replacing_a_key_updates_its_size():
+    cache = ByteLRUCache(max_bytes=10)
+    cache.put("a", b"aaaaaaaa")
+    cache.put("a", b"aa")
+
+    assert cache.stats()["bytes"] == 2
+    assert cache.stats()["entries"] == 1
+
+
+def test_values_larger_than_the_budget_are_not_stored():
+    cache = ByteLRUCache(max_bytes=4)
+    cache.put("a", b"aa")
+    cache.put("big", b"0123456789")
+
+    assert cache.get("big") is None
+    assert cache.get("a") == b"aa"
+
+
+def test_entries_expire_after_ttl():
+    cache = ByteLRUCache(max_bytes=100, ttl_seconds=0.05)
+    cache.put("a", b"alpha")
+    assert cache.get("a") == b"alpha"
+
+    time.sleep(0.06)
+
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["bytes"] == 0
+
+
+def test_delete_and_clear():
+    cache = ByteLRUCache(max_bytes=100)
+    cache.put("a", b"alpha")
+    cache.put("b", b"beta")
+    cache.delete("a")
+    assert cache.get("a") is None
+
+    cache.clear()
+    assert cache.get("b") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_cache_key_ignores_whitespace_differences():
+    key = make_cache_key("A lighthouse  is a tower.\n\nIt emits light.", "Lighthouse", 5, "gemini", "v1")
+
+    assert key == make_cache_key(" A lighthouse is a tower. It emits light. ", " Lighthouse", 5, "gemini", "v1")
+    assert len(key) == 64
+
+
+def test_cache_key_covers_every_generation_input():
+    base = ("A lighthouse is a tower.", "Lighthouse", 5, "gemini", "v1")
+    key = make_cache_key(*base)
+
+    for index, changed in enumerate(["A lighthouse is a house.", "Beacon", 6, "gemini-pro", "v2"]):
+        inputs = list(base)
+        inputs[index] = changed
+        assert make_cache_key(*inputs) != key
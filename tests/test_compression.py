@@ -0,0 +1,52 @@
+"""Tests for compressed storage of article text."""
+
+import pytest
+
+import compression
+from compression import compress_text, decompress_text
+
+ARTICLE = ("A lighthouse is a tower designed to emit light to aid navigation. "
+           "Der Leuchtturm — 灯台 — maják. ") * 200
+
+
+@pytest.mark.parametrize("codec", ["zstd", "zlib"])
+def test_round_trip(monkeypatch, codec):
+    if codec == "zstd" and not compression.ZSTD_AVAILABLE:
+        pytest.skip("zstandard is not installed")
+    monkeypatch.setattr(compression, "ARTICLE_COMPRESSION", codec)
+
+    data, used = compress_text(ARTICLE)
+
+    assert used == codec
+    assert len(data) < len(ARTICLE.encode("utf-8")) / 10
+    assert decompress_text(data, used) == ARTICLE
+
+
+def test_zstd_falls_back_to_zlib_without_zstandard(monkeypatch):
+    monkeypatch.setattr(compression, "ARTICLE_COMPRESSION", "zstd")
+    monkeypatch.setattr(compression, "ZSTD_AVAILABLE", False)
+
+    data, used = compress_text(ARTICLE)
+
+    assert used == "zlib"
+    assert decompress_text(data, used) == ARTICLE
+    with pytest.raises(ValueError, match="install zstandard"):
+        decompress_text(data, "zstd")
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError, match="Unknown compression codec"):
+        decompress_text(b"", "brotli")
+
+
+def test_quiz_article_text_is_stored_compressed():
+    from database import Quiz
+
+    quiz = Quiz()
+    assert quiz.article_text is None
+
+    quiz.article_text = ARTICLE
+
+    assert quiz.article_codec in ("zstd", "zlib")
+    assert len(quiz.article_compressed) < len(ARTICLE)
+    assert quiz.article_text == ARTICLE
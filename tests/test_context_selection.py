@@ -0,0 +1,111 @@
+"""Tests for relevance-ranked prompt context selection."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from context_selection import select_context, split_passages
+
+LEAD = "The Bell Rock Lighthouse is a lighthouse off the coast of Angus, Scotland, built on a reef."
+RELEVANT = [
+    "Construction of the lighthouse on the reef began in 1807 under Robert Stevenson.",
+    "The lighthouse tower is built of granite blocks dovetailed together against the sea.",
+]
+FILLER = [
+    "Local football clubs play their matches on Saturday afternoons during the winter season.",
+    "Many recipes for porridge call for oats, salt, water and sometimes a little cream.",
+    "Gardeners in the region grow potatoes, turnips and kale in small allotments.",
+    "The annual music festival attracts fiddlers and pipers from across the country.",
+    "Rainfall is highest in autumn, when westerly winds bring frequent showers.",
+    "Several bus routes connect the nearby towns with the regional railway station.",
+]
+
+
+def make_article(passages):
+    return "\n\n".join(passages)
+
+
+def test_short_articles_are_sent_whole():
+    content = make_article([LEAD] + RELEVANT)
+
+    assert select_context(content, "Bell Rock Lighthouse", token_budget=10_000) == content
+
+
+def test_selection_fits_the_budget_and_keeps_the_lead():
+    content = make_article([LEAD] + FILLER[:3] + RELEVANT + FILLER[3:])
+    budget_chars = 300
+
+    context = select_context(content, "Bell Rock Lighthouse", token_budget=budget_chars, tokens_per_char=1.0)
+
+    assert len(context) <= budget_chars
+    assert split_passages(context)[0] == LEAD
+
+
+def test_relevant_paragraphs_are_preferred_in_document_order():
+    content = make_article([LEAD] + FILLER[:3] + RELEVANT + FILLER[3:])
+    budget_chars = len(LEAD) + sum(len(p) for p in RELEVANT) + 4
+
+    context = select_context(content, "Bell Rock Lighthouse", token_budget=budget_chars, tokens_per_char=1.0)
+
+    assert split_passages(context) == [LEAD] + RELEVANT
+
+
+def test_near_duplicate_paragraphs_are_skipped():
+    content = make_article([LEAD, RELEVANT[0], RELEVANT[0] + " Really.", RELEVANT[1]] + FILLER)
+    budget_chars = len(LEAD) + sum(len(p) for p in RELEVANT) + 40
+
+    context = select_context(content, "Bell Rock Lighthouse", token_budget=budget_chars, tokens_per_char=1.0)
+
+    assert RELEVANT[0] + " Really." not in context
+    assert RELEVANT[1] in context
+
+
+class CountingModel:
+    """Stands in for the Gemini model's token counter."""
+
+    def __init__(self, tokens_per_char=0.5):
+        self.tokens_per_char = tokens_per_char
+        self.calls = 0
+
+    async def count_tokens_async(self, content, request_options=None):
+        self.calls += 1
+        return type("CountTokensResponse", (), {"total_tokens": int(len(content) * self.tokens_per_char)})()
+
+
+def prompt_context(content, model, monkeypatch):
+    import llm_quiz_generator
+
+    acquired = []
+
+    async def acquire(tokens, priority=None, max_wait=None):
+        acquired.append(tokens)
+
+    monkeypatch.setattr(llm_quiz_generator.gemini_rate_limiter, "acquire", acquire)
+    monkeypatch.setattr(llm_quiz_generator, "QUIZ_CONTEXT_TOKEN_BUDGET", 100)
+    monkeypatch.setattr("context_selection.QUIZ_CONTEXT_TOKEN_BUDGET", 100)
+    context = asyncio.run(llm_quiz_generator.prompt_context_async(model, content, "Bell Rock Lighthouse"))
+    return context, acquired
+
+
+def test_prompt_context_skips_token_count_under_budget(monkeypatch):
+    model = CountingModel()
+    content = LEAD  # about 25 tokens by the default ratio
+
+    context, acquired = prompt_context(content, model, monkeypatch)
+
+    assert context == content
+    assert model.calls == 0 and acquired == []
+
+
+def test_prompt_context_counts_tokens_through_the_rate_limiter(monkeypatch):
+    model = CountingModel(tokens_per_char=0.5)
+    content = make_article([LEAD] + RELEVANT + FILLER)
+
+    context, acquired = prompt_context(content, model, monkeypatch)
+
+    assert model.calls == 1 and acquired == [0]
+    # The measured ratio (twice the default) halves the characters selected
+    assert len(context) <= 100 / 0.5
+    assert context.startswith(LEAD)
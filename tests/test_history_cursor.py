@@ -0,0 +1,32 @@
+"""Tests for the opaque /history pagination cursor."""
+
+import base64
+from datetime import datetime
+
+import pytest
+
+from main import decode_history_cursor, encode_history_cursor
+
+
+@pytest.mark.parametrize("date_generated, quiz_id", [
+    (datetime(2024, 1, 1, 12, 0, 0), 1),
+    (datetime(2024, 1, 1, 12, 0, 0, 123456), 987654321),
+    (datetime(1999, 12, 31, 23, 59, 59, 1), 42),
+])
+def test_cursor_round_trip(date_generated, quiz_id):
+    cursor = encode_history_cursor(date_generated, quiz_id)
+
+    assert decode_history_cursor(cursor) == (date_generated, quiz_id)
+    # Usable as a query parameter as-is
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    base64.urlsafe_b64encode(b"2024-01-01T12:00:00").decode(),
+    base64.urlsafe_b64encode(b"yesterday|1").decode(),
+    base64.urlsafe_b64encode(b"2024-01-01T12:00:00|one").decode(),
+])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_history_cursor(cursor)
@@ -0,0 +1,77 @@
+"""Tests that every HTML extraction backend matches html.parser on the saved pages."""
+
+import codecs
+import glob
+import os
+
+import pytest
+
+from html_extractors import EXTRACTORS, StreamingArticleParser, extract_with_html_parser
+from scraper import find_revision_id
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                         "fixtures", "wikipedia", "*.html")))
+
+
+def load(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def normalized(extraction):
+    title, paragraphs = extraction
+    return (title or "").strip(), [paragraph.strip() for paragraph in paragraphs or []]
+
+
+@pytest.mark.parametrize("backend", sorted(EXTRACTORS))
+@pytest.mark.parametrize("path", FIXTURES, ids=os.path.basename)
+def test_backend_matches_html_parser(backend, path):
+    html = load(path)
+
+    assert normalized(EXTRACTORS[backend](html)) == normalized(extract_with_html_parser(html))
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=os.path.basename)
+def test_reference_extraction_finds_the_article(path):
+    title, paragraphs = normalized(extract_with_html_parser(load(path)))
+
+    assert title.startswith("Lighthouse")
+    assert len(paragraphs) > 5
+
+
+def stream(html, parser, chunk_size):
+    """Feed a page to a StreamingArticleParser in chunks, as the scraper does."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for start in range(0, len(html), chunk_size):
+        parser.feed(decoder.decode(html[start:start + chunk_size]))
+        if parser.done:
+            break
+    return parser
+
+
+@pytest.mark.parametrize("chunk_size", [97, 4096, 16384])
+@pytest.mark.parametrize("path", FIXTURES, ids=os.path.basename)
+def test_streaming_parser_matches_html_parser(path, chunk_size):
+    html = load(path)
+    title, paragraphs = normalized(extract_with_html_parser(html))
+
+    parser = stream(html, StreamingArticleParser(char_budget=10 ** 9, min_paragraph_chars=50), chunk_size)
+
+    assert parser.found_content
+    assert parser.title.strip() == title
+    assert parser.paragraphs == [paragraph for paragraph in paragraphs if len(paragraph) > 50]
+    assert parser.revision_id is not None
+    assert parser.revision_id == find_revision_id(html)
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=os.path.basename)
+def test_streaming_parser_stops_once_the_budget_is_filled(path):
+    html = load(path)
+    full = stream(html, StreamingArticleParser(char_budget=10 ** 9), 4096).paragraphs
+
+    parser = stream(html, StreamingArticleParser(char_budget=1000), 4096)
+
+    assert parser.done
+    assert parser.paragraphs == full[:len(parser.paragraphs)]
+    assert len("\n\n".join(parser.paragraphs)) > 1000
+    assert len("\n\n".join(parser.paragraphs[:-1])) <= 1000
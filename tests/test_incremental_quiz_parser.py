@@ -0,0 +1,57 @@
+"""Tests for the streamed quiz reply parser."""
+
+import json
+
+from llm_quiz_generator import IncrementalQuizParser, parse_quiz_response
+
+QUIZ = {
+    "summary": "A lighthouse is a tower {with a light}, \"guiding\" ships.",
+    "questions": [
+        {"question": "What does a lighthouse emit?", "options": ["Light", "Sound", "Smoke", "Heat"],
+         "correct_answer": "Light", "explanation": "It emits light [1].", "difficulty": "easy"},
+        {"question": "Which brace is this: }?", "options": ["{", "}", "[", "]"],
+         "correct_answer": "}", "explanation": "A \\ backslash and a \"quote\".", "difficulty": "hard"},
+    ],
+    "related_topics": ["Lightvessel", "Fresnel lens"],
+}
+
+
+def feed_in_chunks(text, size):
+    parser = IncrementalQuizParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    return events
+
+
+def test_reports_summary_and_each_question():
+    reply = "```json\n" + json.dumps(QUIZ, indent=2) + "\n```"
+
+    for size in (1, 7, 64, len(reply)):
+        events = feed_in_chunks(reply, size)
+        assert events == [("summary", QUIZ["summary"])] + [("question", q) for q in QUIZ["questions"]]
+
+
+def test_questions_are_reported_as_soon_as_they_close():
+    reply = json.dumps(QUIZ)
+    first_end = reply.index('"hard"')  # Inside the second question
+    parser = IncrementalQuizParser()
+
+    events = parser.feed(reply[:first_end])
+
+    assert [kind for kind, _ in events] == ["summary", "question"]
+    assert parser.feed(reply[first_end:]) == [("question", QUIZ["questions"][1])]
+
+
+def test_nested_keys_named_summary_are_ignored():
+    reply = json.dumps({"questions": [{"question": "Q", "summary": "not the quiz summary"}], "summary": "S"})
+
+    events = feed_in_chunks(reply, 5)
+
+    assert events == [("question", {"question": "Q", "summary": "not the quiz summary"}), ("summary", "S")]
+
+
+def test_full_reply_still_parses():
+    reply = "```json\n" + json.dumps(QUIZ) + "\n```"
+
+    assert parse_quiz_response(reply) == QUIZ
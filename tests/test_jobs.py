@@ -0,0 +1,135 @@
+"""Tests for the background job manager and its in-memory queue backend."""
+
+import asyncio
+
+import pytest
+
+import jobs
+from jobs import FAILED, QUEUED, SUCCEEDED, JobManager, QueueFullError
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+async def wait_until_finished(manager, job, timeout=1.0):
+    for _ in range(int(timeout / 0.01)):
+        if manager.get(job.id).finished:
+            return manager.get(job.id)
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job.id} did not finish")
+
+
+def test_job_runs_through_the_backend():
+    async def handler(job):
+        return {"url": job.wikipedia_url, "questions": job.num_questions}
+
+    async def scenario():
+        manager = JobManager(handler, workers=2)
+        manager.start()
+        job = manager.submit("https://en.wikipedia.org/wiki/Lighthouse", 5)
+        done = await wait_until_finished(manager, job)
+        await manager.stop()
+        return manager, done
+
+    manager, done = asyncio.run(scenario())
+
+    assert done.status == SUCCEEDED
+    assert done.result == {"url": "https://en.wikipedia.org/wiki/Lighthouse", "questions": 5}
+    assert done.started_at <= done.finished_at
+    assert manager.queue.load_job(done.id) is done
+    assert manager.stats()[SUCCEEDED] == 1
+
+
+def test_handler_error_fails_the_job():
+    async def handler(job):
+        raise HTTPError(422, "Article not found")
+
+    async def scenario():
+        manager = JobManager(handler, workers=1)
+        manager.start()
+        done = await wait_until_finished(manager, manager.submit("https://en.wikipedia.org/wiki/Nope", 5))
+        await manager.stop()
+        return done
+
+    done = asyncio.run(scenario())
+
+    assert done.status == FAILED
+    assert done.error == "Article not found"
+    assert done.status_code == 422
+
+
+def test_full_queue_rejects_jobs():
+    async def handler(job):
+        await asyncio.sleep(1)
+
+    async def scenario():
+        manager = JobManager(handler, workers=1, queue_size=1)
+        manager.start()
+        manager.submit("https://en.wikipedia.org/wiki/A", 5)
+        await asyncio.sleep(0.01)  # the worker takes the first job
+        manager.submit("https://en.wikipedia.org/wiki/B", 5)
+        with pytest.raises(QueueFullError):
+            manager.submit("https://en.wikipedia.org/wiki/C", 5)
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_stop_fails_queued_and_running_jobs():
+    started = []
+
+    async def handler(job):
+        started.append(job.id)
+        await asyncio.sleep(1)
+
+    async def scenario():
+        manager = JobManager(handler, workers=1)
+        manager.start()
+        running = manager.submit("https://en.wikipedia.org/wiki/A", 5)
+        queued = manager.submit("https://en.wikipedia.org/wiki/B", 5)
+        await asyncio.sleep(0.01)
+        assert manager.get(queued.id).status == QUEUED
+        await manager.stop()
+        return manager, manager.get(running.id), manager.get(queued.id)
+
+    manager, running, queued = asyncio.run(scenario())
+
+    assert started == [running.id]
+    assert running.status == FAILED and running.status_code == 503
+    assert queued.status == FAILED and queued.status_code == 503
+    assert queued.finished_at is not None
+    with pytest.raises(RuntimeError):
+        manager.submit("https://en.wikipedia.org/wiki/C", 5)
+
+
+def test_finished_jobs_are_pruned_over_the_cap(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_MAX_STORED", 2)
+
+    async def handler(job):
+        return job.wikipedia_url
+
+    async def scenario():
+        manager = JobManager(handler, workers=1)
+        manager.start()
+        first = manager.submit("https://en.wikipedia.org/wiki/A", 5)
+        await wait_until_finished(manager, first)
+        second = manager.submit("https://en.wikipedia.org/wiki/B", 5)
+        await wait_until_finished(manager, second)
+        third = manager.submit("https://en.wikipedia.org/wiki/C", 5)
+        await wait_until_finished(manager, third)
+        await manager.stop()
+        return manager, first, third
+
+    manager, first, third = asyncio.run(scenario())
+
+    assert manager.get(first.id) is None
+    assert manager.get(third.id).status == SUCCEEDED
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown job queue backend"):
+        JobManager(lambda job: None, backend="redis")
@@ -0,0 +1,62 @@
+"""Tests for the local (no LLM) fill-in-the-blank quiz generator."""
+
+from local_quiz_generator import BLANK, generate_local_quiz
+
+ARTICLE = "\n\n".join([
+    "The Bell Rock Lighthouse is the oldest surviving sea-washed lighthouse in the world, off the coast of Angus.",
+    "Construction began in 1807 under Robert Stevenson after years of argument over the cost of the project.",
+    "John Rennie was appointed chief engineer, although Robert Stevenson directed most of the work on the reef.",
+    "The tower is 35 metres tall and was built from 2,835 blocks of granite and sandstone dovetailed together.",
+    "The light was first lit in 1811 and could be seen from a distance of 35 miles on a clear night.",
+    "Alexander Nasmyth painted the finished tower, and the picture now hangs in the Scottish National Gallery.",
+    "In 1843 the lantern was fitted with new reflectors designed by Alan Stevenson to improve its range.",
+    "During the Second World War German aircraft attacked the tower in 1940 and damaged the lantern room.",
+    "The keepers were withdrawn in 1988 when the light was automated by the Northern Lighthouse Board.",
+    "A fire in 1987 destroyed the kitchen and library, which had been used by keepers for 176 years.",
+    "Walter Scott visited the reef in 1814 and wrote a short poem in the visitors album kept by the keepers.",
+    "Today the Signal Tower Museum in Arbroath tells the story of the keepers and their families.",
+])
+
+
+def test_generates_the_requested_number_of_questions():
+    quiz = generate_local_quiz(ARTICLE, "Bell Rock Lighthouse", 5)
+
+    assert len(quiz["questions"]) == 5
+    assert quiz["summary"].startswith("The Bell Rock Lighthouse is the oldest")
+    answers = [question["correct_answer"] for question in quiz["questions"]]
+    assert len(set(answers)) == len(answers)
+    for question in quiz["questions"]:
+        assert question["question"].startswith("Fill in the blank: ") and BLANK in question["question"]
+        assert len(question["options"]) == 4 and len(set(question["options"])) == 4
+        assert question["correct_answer"] in question["options"]
+        # Filling the blank gives back the sentence quoted in the explanation
+        sentence = question["question"].replace("Fill in the blank: ", "", 1).replace(
+            BLANK, question["correct_answer"], 1)
+        assert question["explanation"] == f"The article states: \"{sentence}\""
+        assert question["difficulty"] in ("easy", "medium", "hard")
+
+
+def test_answers_never_give_away_the_title():
+    quiz = generate_local_quiz(ARTICLE, "Bell Rock Lighthouse", 5)
+
+    for question in quiz["questions"]:
+        assert "lighthouse" not in question["correct_answer"].lower()
+        assert "bell" not in question["correct_answer"].lower()
+    assert all("Bell Rock" not in topic for topic in quiz["related_topics"])
+
+
+def test_output_is_deterministic_per_article():
+    first = generate_local_quiz(ARTICLE, "Bell Rock Lighthouse", 5)
+
+    assert generate_local_quiz(ARTICLE, "Bell Rock Lighthouse", 5) == first
+
+
+def test_questions_follow_article_order():
+    quiz = generate_local_quiz(ARTICLE, "Bell Rock Lighthouse", 5)
+
+    positions = [ARTICLE.index(question["explanation"].split('"')[1]) for question in quiz["questions"]]
+    assert positions == sorted(positions)
+
+
+def test_short_articles_yield_no_quiz():
+    assert generate_local_quiz(ARTICLE.split("\n\n")[0], "Bell Rock Lighthouse", 5) is None
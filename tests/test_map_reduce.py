@@ -0,0 +1,80 @@
+"""Tests for splitting long articles into sections and merging their quizzes."""
+
+from llm_quiz_generator import merge_section_quizzes, split_sections
+
+
+def question(text, answer, difficulty="medium"):
+    return {"question": text, "options": [answer, "B", "C", "D"], "correct_answer": answer,
+            "explanation": None, "difficulty": difficulty}
+
+
+def paragraphs(count, length=200):
+    return [f"Paragraph {index} " + "x" * length for index in range(count)]
+
+
+def test_split_sections_keeps_paragraphs_whole_and_in_order():
+    passages = paragraphs(9)
+
+    sections = split_sections("\n\n".join(passages), 3)
+
+    assert len(sections) == 3
+    assert "\n\n".join(sections) == "\n\n".join(passages)
+    assert [section.count("Paragraph") for section in sections] == [3, 3, 3]
+
+
+def test_split_sections_balances_by_length():
+    passages = ["a" * 1000, "b" * 100, "c" * 100, "d" * 800]
+
+    sections = split_sections("\n\n".join(passages), 2)
+
+    assert sections == ["a" * 1000, "\n\n".join(passages[1:])]
+
+
+def test_split_sections_never_exceeds_the_paragraph_count():
+    assert split_sections("\n\n".join(paragraphs(2)), 5) == paragraphs(2)
+    assert split_sections("\n\n".join(paragraphs(3)), 0) == ["\n\n".join(paragraphs(3))]
+
+
+def test_merge_covers_every_section_in_article_order():
+    subjects = [["reef", "tower", "granite"], ["lantern", "keeper", "signal"], ["storm", "repair", "museum"]]
+    sections = [
+        {"summary": "First." if s == 0 else "Later.",
+         "questions": [question(f"What about the {subject}?", subject) for subject in subjects[s]],
+         "related_topics": [f"Topic {s}", "Shared"]}
+        for s in range(3)
+    ]
+
+    merged = merge_section_quizzes(sections, 4)
+
+    answers = [q["correct_answer"] for q in merged["questions"]]
+    assert answers == ["reef", "tower", "lantern", "storm"]
+    assert merged["summary"] == "First."
+    assert merged["related_topics"] == ["Topic 0", "Shared", "Topic 1", "Topic 2"]
+
+
+def test_merge_balances_difficulty():
+    section = {"summary": "S.", "questions": [
+        question("Which year was the tower lit?", "1811", "easy"),
+        question("Which engineer drew the plans?", "Stevenson", "easy"),
+        question("What stone was used for the tower?", "Granite", "medium"),
+        question("How were the blocks joined together?", "Dovetails", "hard"),
+    ]}
+
+    merged = merge_section_quizzes([section], 3)
+
+    assert sorted(q["difficulty"] for q in merged["questions"]) == ["easy", "hard", "medium"]
+
+
+def test_merge_drops_near_duplicates_unless_short():
+    first = {"summary": "S.", "questions": [question("When was the Bell Rock Lighthouse built?", "1810")]}
+    second = {"summary": "T.", "questions": [
+        question("When was the Bell Rock Lighthouse completed?", "1810"),
+        question("Who designed the lantern?", "Rennie"),
+    ]}
+
+    merged = merge_section_quizzes([first, second], 2)
+    assert [q["correct_answer"] for q in merged["questions"]] == ["1810", "Rennie"]
+
+    # With too few distinct questions the near-duplicate fills the gap
+    merged = merge_section_quizzes([first, second], 3)
+    assert len(merged["questions"]) == 3
@@ -0,0 +1,62 @@
+"""Tests for routing quiz requests to Gemini models."""
+
+import time
+
+import pytest
+
+import model_router
+from model_router import MIN_LATENCY_SAMPLES, ModelRouter
+
+ROUTES = [
+    {"model": "flash-lite", "max_chars": 8000, "max_questions": 5},
+    {"model": "pro", "min_questions": 10, "max_p95_ms": 40000},
+]
+
+
+class Usage:
+    prompt_token_count = 2000
+    candidates_token_count = 500
+
+
+def test_first_matching_route_wins():
+    router = ModelRouter(ROUTES, "flash")
+
+    assert router.choose(5000, 5) == "flash-lite"
+    assert router.choose(9000, 5) == "flash"
+    assert router.choose(5000, 7) == "flash"
+    assert router.choose(20000, 10) == "pro"
+    assert router.stats()["routed"] == {"flash-lite": 1, "flash": 2, "pro": 1}
+
+
+def test_slow_model_is_skipped_until_its_latency_ages_out(monkeypatch):
+    router = ModelRouter(ROUTES, "flash")
+    for _ in range(MIN_LATENCY_SAMPLES - 1):
+        router.record_success("pro", 60)
+    # Too few samples to judge the model yet
+    assert router.choose(20000, 10) == "pro"
+
+    router.record_success("pro", 60)
+    assert router.choose(20000, 10) == "flash"
+
+    later = time.monotonic() + model_router.LATENCY_MAX_AGE_SECONDS + 1
+    monkeypatch.setattr(model_router.time, "monotonic", lambda: later)
+    assert router.choose(20000, 10) == "pro"
+
+
+def test_usage_and_cost_are_recorded_per_model():
+    router = ModelRouter([], "flash", prices={"flash": [0.1, 0.4]})
+    router.record_success("flash", 1.5, Usage())
+    router.record_error("flash")
+
+    stats = router.stats()["models"]["flash"]
+
+    assert stats["requests"] == 2 and stats["errors"] == 1
+    assert stats["input_tokens"] == 2000 and stats["output_tokens"] == 500
+    assert stats["cost_usd"] == pytest.approx((2000 * 0.1 + 500 * 0.4) / 1_000_000)
+    assert stats["latency_p95_ms"] == 1500
+
+
+@pytest.mark.parametrize("route", [{"max_chars": 100}, {"model": "flash", "max_tokens": 100}])
+def test_invalid_routes_are_rejected(route):
+    with pytest.raises(ValueError, match="Invalid model route"):
+        ModelRouter([route], "flash")
@@ -0,0 +1,59 @@
+"""Tests that the fast quiz encoder matches the QuizResponse model."""
+
+import json
+from datetime import datetime
+
+import pytest
+
+import quiz_json
+from database import Quiz
+from models import QuizResponse
+from quiz_json import build_quiz_json
+from quiz_service import quiz_to_response
+
+QUIZ_DATA = {
+    "summary": "A lighthouse is a tower that emits light — \"guiding\" ships.",
+    "questions": [
+        {"question": "What does a lighthouse emit?", "options": ["Light", "Sound", "Smoke", "Heat"],
+         "correct_answer": "Light", "explanation": "It emits light.", "difficulty": "easy"},
+        # Older payloads may lack the optional fields
+        {"question": "Where is Bell Rock?", "options": ["Scotland", "Wales", "Ireland", "Cornwall"],
+         "correct_answer": "Scotland"},
+    ],
+    "related_topics": ["Lightvessel", "Fresnel lens"],
+}
+
+
+def expected_json(quiz_id, url, title, quiz_data, created_at):
+    return QuizResponse(
+        id=quiz_id, wikipedia_url=url, title=title,
+        summary=quiz_data.get("summary", ""),
+        questions=quiz_data.get("questions", []),
+        related_topics=quiz_data.get("related_topics", []),
+        created_at=created_at,
+    ).model_dump_json()
+
+
+@pytest.mark.parametrize("orjson", [True, False])
+@pytest.mark.parametrize("quiz_data", [QUIZ_DATA, {"summary": "Empty", "questions": []}])
+@pytest.mark.parametrize("created_at", [datetime(2024, 1, 1, 12, 0), datetime(2024, 1, 1, 12, 0, 0, 123456)])
+def test_build_quiz_json_matches_model_dump_json(monkeypatch, orjson, quiz_data, created_at):
+    if orjson and not quiz_json.ORJSON_AVAILABLE:
+        pytest.skip("orjson is not installed")
+    monkeypatch.setattr(quiz_json, "ORJSON_AVAILABLE", orjson)
+    args = (7, "https://en.wikipedia.org/wiki/Lighthouse", "Lighthouse", quiz_data, created_at)
+
+    body = build_quiz_json(*args)
+
+    assert body == expected_json(*args).encode("utf-8")
+
+
+def test_quiz_to_response_carries_serialized_body():
+    created_at = datetime(2024, 1, 1, 12, 0)
+    quiz = Quiz(id=7, url="https://en.wikipedia.org/wiki/Lighthouse", title="Lighthouse",
+                full_quiz_data=QUIZ_DATA, date_generated=created_at)
+
+    response = quiz_to_response(quiz)
+
+    assert json.loads(response.response_json) == json.loads(response.model_dump_json())
+    assert response.response_json == build_quiz_json(7, quiz.url, quiz.title, QUIZ_DATA, created_at)
@@ -0,0 +1,27 @@
+"""Tests for the quiz pipeline helpers that need no database."""
+
+from datetime import datetime, timedelta
+
+import quiz_service
+from database import Quiz
+from local_quiz_generator import LOCAL_GENERATOR
+
+
+def test_gemini_quizzes_are_reused():
+    assert not quiz_service.is_stand_in(Quiz(id=1, generated_by="gemini-2.5-flash"))
+
+
+def test_local_quizzes_are_regenerated():
+    assert quiz_service.is_stand_in(Quiz(id=1, generated_by=LOCAL_GENERATOR))
+
+
+def test_local_quiz_with_a_running_upgrade_is_kept():
+    quiz = Quiz(id=1, generated_by=LOCAL_GENERATOR, upgrade_started_at=datetime.now())
+
+    assert not quiz_service.is_stand_in(quiz)
+
+
+def test_local_quiz_with_a_lost_upgrade_is_regenerated():
+    started = datetime.now() - timedelta(seconds=quiz_service.QUIZ_UPGRADE_MAX_SECONDS + 1)
+
+    assert quiz_service.is_stand_in(Quiz(id=1, generated_by=LOCAL_GENERATOR, upgrade_started_at=started))
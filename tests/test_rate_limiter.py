@@ -0,0 +1,108 @@
+"""Tests for the Gemini rate limiter."""
+
+import asyncio
+
+import pytest
+
+from rate_limiter import GeminiRateLimiter, RateLimitExceeded, INTERACTIVE, BACKGROUND, gemini_priority
+
+
+def test_disabled_limiter_never_waits():
+    limiter = GeminiRateLimiter(requests_per_minute=0, tokens_per_minute=0)
+
+    async def acquire_many():
+        for _ in range(100):
+            await limiter.acquire(10_000)
+
+    asyncio.run(acquire_many())
+    assert not limiter.enabled
+    assert limiter.granted == 0
+
+
+def test_grants_up_to_the_request_budget():
+    limiter = GeminiRateLimiter(requests_per_minute=3)
+
+    async def acquire():
+        for _ in range(3):
+            await limiter.acquire(100, max_wait=0.5)
+
+    asyncio.run(acquire())
+    assert limiter.granted == 3
+    assert limiter.stats()["requests_available"] == 0
+
+
+def test_rejects_when_the_estimated_wait_is_too_long():
+    # 60 requests per minute: one more request every second
+    limiter = GeminiRateLimiter(requests_per_minute=60)
+    limiter.requests.level = 0
+
+    async def acquire():
+        await limiter.acquire(100, max_wait=0.1)
+
+    with pytest.raises(RateLimitExceeded) as error:
+        asyncio.run(acquire())
+    assert error.value.retry_after == pytest.approx(1, abs=0.1)
+    assert limiter.rejected == 1
+
+
+def test_token_budget():
+    limiter = GeminiRateLimiter(tokens_per_minute=6000)
+
+    async def acquire():
+        await limiter.acquire(5000, max_wait=0.1)
+        await limiter.acquire(5000, max_wait=0.1)
+
+    with pytest.raises(RateLimitExceeded):
+        asyncio.run(acquire())
+    assert limiter.granted == 1
+
+
+def test_record_usage_corrects_the_token_bucket():
+    limiter = GeminiRateLimiter(tokens_per_minute=6000)
+
+    async def acquire():
+        await limiter.acquire(1000, max_wait=0.1)
+
+    asyncio.run(acquire())
+    limiter.record_usage(1000, 3000)
+
+    assert limiter.stats()["tokens_available"] == pytest.approx(3000, abs=5)
+
+
+def test_interactive_requests_go_before_background():
+    # 600 requests per minute: one more request every 0.1 seconds
+    limiter = GeminiRateLimiter(requests_per_minute=600)
+    limiter.requests.level = 0
+    order = []
+
+    async def request(name, priority):
+        await limiter.acquire(1, priority=priority, max_wait=5)
+        order.append(name)
+
+    async def run():
+        background = [asyncio.ensure_future(request(f"background-{i}", BACKGROUND)) for i in range(2)]
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(request("interactive", INTERACTIVE))
+        await asyncio.gather(*background, interactive)
+
+    asyncio.run(run())
+    assert order == ["interactive", "background-0", "background-1"]
+
+
+def test_priority_follows_the_context():
+    limiter = GeminiRateLimiter(requests_per_minute=600)
+    limiter.requests.level = 0
+    order = []
+
+    async def request(name):
+        await limiter.acquire(1, max_wait=5)
+        order.append(name)
+
+    async def run():
+        with gemini_priority(BACKGROUND):
+            background = asyncio.ensure_future(request("background"))
+        await asyncio.sleep(0)
+        await asyncio.gather(background, request("interactive"))
+
+    asyncio.run(run())
+    assert order == ["interactive", "background"]
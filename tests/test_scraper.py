@@ -0,0 +1,118 @@
+"""Tests for URL canonicalization and the Action API article source."""
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import scraper
+from scraper import canonicalize_wikipedia_url
+
+LEAD = "A lighthouse is a tower, building, or other structure designed to emit light to aid navigation."
+HISTORY = "Before the development of clearly defined ports, mariners were guided by fires built on hilltops."
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://en.wikipedia.org/wiki/Lighthouse", "https://en.wikipedia.org/wiki/Lighthouse"),
+    ("http://en.m.wikipedia.org/wiki/Lighthouse", "https://en.wikipedia.org/wiki/Lighthouse"),
+    ("https://en.wikipedia.org/wiki/lighthouse?oldid=1#History", "https://en.wikipedia.org/wiki/Lighthouse"),
+    ("https://en.wikipedia.org/wiki/Bell%20Rock%20Lighthouse", "https://en.wikipedia.org/wiki/Bell_Rock_Lighthouse"),
+    ("https://EN.Wikipedia.org:443/wiki/Python_(programming_language)",
+     "https://en.wikipedia.org/wiki/Python_(programming_language)"),
+])
+def test_canonicalize_wikipedia_url(url, expected):
+    assert canonicalize_wikipedia_url(url) == expected
+
+
+def test_canonicalize_wikipedia_url_is_idempotent():
+    url = canonicalize_wikipedia_url("https://de.m.wikipedia.org/wiki/K%C3%B6ln")
+    assert canonicalize_wikipedia_url(url) == url
+
+
+class StubActionAPI(BaseHTTPRequestHandler):
+    """Answers MediaWiki Action API queries for a single page."""
+
+    revision_id = 1187654321
+    requests = []
+
+    def do_GET(self):
+        params = {key: values[0] for key, values in parse_qs(urlsplit(self.path).query).items()}
+        type(self).requests.append(params)
+        page = {"pageid": 1, "title": params["titles"].replace("_", " "),
+                "revisions": [{"revid": self.revision_id}]}
+        if params["titles"] == "Missing_page":
+            page = {"title": "Missing page", "missing": True}
+        elif "extracts" in params["prop"]:
+            page["extract"] = f"{LEAD}\n\nHistory\n\n{HISTORY}"
+        body = json.dumps({"query": {"pages": [page]}}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api_source(monkeypatch):
+    """Point the API article source at a local stub of the Action API."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubActionAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    StubActionAPI.requests = []
+    monkeypatch.setattr(scraper, "SCRAPER_SOURCE", "api")
+    monkeypatch.setattr(scraper, "WIKIPEDIA_API_URL", f"http://127.0.0.1:{server.server_port}/w/api.php")
+    yield StubActionAPI
+    server.shutdown()
+    server.server_close()
+
+
+def test_api_source_fetches_plain_text_extract(api_source):
+    article = scraper.scrape_wikipedia("https://en.wikipedia.org/wiki/Lighthouse")
+
+    assert article["title"] == "Lighthouse"
+    # Section headings are dropped like short paragraphs in the HTML scraper
+    assert article["full_content"] == f"{LEAD}\n\n{HISTORY}"
+    assert article["revision_id"] == 1187654321
+    assert api_source.requests[0]["titles"] == "Lighthouse"
+    assert api_source.requests[0]["prop"] == "extracts|revisions"
+
+
+def test_api_source_skips_extract_for_known_revision(api_source):
+    validators = {"revision_id": 1187654321}
+
+    assert scraper.scrape_wikipedia("https://en.wikipedia.org/wiki/Lighthouse", validators) is None
+    assert [params["prop"] for params in api_source.requests] == ["revisions"]
+
+
+def test_api_source_refetches_changed_revision(api_source):
+    article = scraper.scrape_wikipedia("https://en.wikipedia.org/wiki/Lighthouse", {"revision_id": 1})
+
+    assert article["revision_id"] == 1187654321
+    assert [params["prop"] for params in api_source.requests] == ["revisions", "extracts|revisions"]
+
+
+def test_api_source_missing_article(api_source):
+    with pytest.raises(Exception, match="Article not found"):
+        scraper.scrape_wikipedia("https://en.wikipedia.org/wiki/Missing_page")
+
+
+def test_api_source_async(api_source):
+    async def scrape():
+        try:
+            first = await scraper.scrape_wikipedia_async("https://en.m.wikipedia.org/wiki/Lighthouse")
+            again = await scraper.scrape_wikipedia_async(
+                "https://en.wikipedia.org/wiki/Lighthouse", {"revision_id": first["revision_id"]}
+            )
+            return first, again
+        finally:
+            await scraper.close_http_clients()
+
+    first, again = asyncio.run(scrape())
+
+    assert first["full_content"] == f"{LEAD}\n\n{HISTORY}"
+    assert again is None
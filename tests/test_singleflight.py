@@ -0,0 +1,97 @@
+"""Tests for in-process request coalescing."""
+
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_run():
+    async def scenario():
+        flights = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "quiz"
+
+        results = await asyncio.gather(*(flights.do(("url", 5), work) for _ in range(5)))
+        return flights, calls, results
+
+    flights, calls, results = asyncio.run(scenario())
+
+    assert results == ["quiz"] * 5
+    assert len(calls) == 1
+    assert flights.stats() == {"in_flight": 0, "started": 1, "coalesced": 4}
+
+
+def test_different_keys_run_separately():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def work(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        return flights, await asyncio.gather(
+            flights.do(("url", 5), lambda: work(5)),
+            flights.do(("url", 10), lambda: work(10)),
+        )
+
+    flights, results = asyncio.run(scenario())
+
+    assert results == [5, 10]
+    assert flights.started == 2 and flights.coalesced == 0
+
+
+def test_exception_reaches_every_caller():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("scrape failed")
+
+        results = await asyncio.gather(flights.do("key", work), flights.do("key", work),
+                                       return_exceptions=True)
+        return flights, results
+
+    flights, results = asyncio.run(scenario())
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flights.in_flight() == 0
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.ensure_future(flights.do("key", work))
+        second = asyncio.ensure_future(flights.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_key_is_released_after_completion():
+    async def scenario():
+        flights = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            return len(calls)
+
+        return [await flights.do("key", work), await flights.do("key", work)]
+
+    assert asyncio.run(scenario()) == [1, 2]
@@ -5,6 +5,7 @@ Script to view database structure and data
 from sqlalchemy import inspect, text
 from database import engine, SessionLocal, Quiz
 from datetime import datetime
+import json
 
 def view_database_structure():
     """View all tables and their columns"""
@@ -50,7 +51,7 @@ def view_all_quizzes():
                 print(f"URL:             {quiz.url}")
                 print(f"Date Generated:  {quiz.date_generated}")
                 print(f"Scraped Content: {quiz.scraped_content[:100] if quiz.scraped_content else 'None'}...")
-                print(f"Quiz Data:       {quiz.full_quiz_data[:100]}...")
+                print(f"Quiz Data:       {json.dumps(quiz.full_quiz_data)[:100]}...")
                 print()
                 
     except Exception as e:
@@ -70,7 +71,7 @@ def add_sample_quiz():
             url="https://en.wikipedia.org/wiki/Artificial_intelligence",
             title="Artificial Intelligence Quiz",
             scraped_content="Artificial intelligence (AI) is intelligence demonstrated by machines...",
-            full_quiz_data='{"questions": [{"q": "What is AI?", "options": ["A", "B", "C", "D"], "answer": "A"}]}'
+            full_quiz_data={"questions": [{"q": "What is AI?", "options": ["A", "B", "C", "D"], "answer": "A"}]}
         )
         
         db.add(sample_quiz)